@@ -0,0 +1,236 @@
+"""Автоматическая трассировка скана: средние линии штрихов в кривые (x, y, radius) для редактора"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bitmap import (binarize, component_boxes, crossing_numbers, distance_transform, label_components,
+                    skeletonize, thin_corners)
+
+MIN_AREA = 16  # Области меньшей площади (пиксели) считаются грязью
+FIT_TOLERANCE = 1.0  # Допустимое отклонение кривой от средней линии (и радиуса от толщины штриха) в пикселях
+MIN_RADIUS = 1.0
+PARALLEL_MIN_PIXELS = 200000  # Меньше пикселей чернил - трассируем в одном процессе
+
+# Смещения 8 соседей пикселя
+NEIGHBOR_OFFSETS = ((0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def skeleton_paths(skeleton, distance=None):
+    """Разбивает m-связный скелет на пути [(строка, столбец), ...] между концами и развилками.
+
+    Соседние пиксели развилки считаются одним узлом. Замкнутая петля без узлов дает путь,
+    который кончается своим первым пикселем. Если задана карта расстояний distance,
+    следы утончения у развилок убираются (см. _simplify_graph).
+    """
+    count, _ = crossing_numbers(skeleton)
+    pixels = set(zip(*(axis.tolist() for axis in np.nonzero(skeleton))))
+
+    def neighbors(pixel):
+        row, col = pixel
+        return [(row + dr, col + dc) for dr, dc in NEIGHBOR_OFFSETS if (row + dr, col + dc) in pixels]
+
+    # Узел - конец линии или группа соседних пикселей развилки; значение - пиксель-представитель
+    node_of = {pixel: pixel for pixel in pixels if count[pixel] <= 1}
+    junctions = {pixel for pixel in pixels if count[pixel] >= 3}
+    for pixel in sorted(junctions):
+        if pixel in node_of:
+            continue
+        node_of[pixel] = pixel
+        stack = [pixel]
+        while stack:
+            for neighbor in neighbors(stack.pop()):
+                if neighbor in junctions and neighbor not in node_of:
+                    node_of[neighbor] = pixel
+                    stack.append(neighbor)
+
+    visited = set()
+
+    def walk(path):
+        # У пикселя m-связной линии ровно два соседа: идем к тому, откуда не пришли
+        prev, current = path[-2], path[-1]
+        while current not in node_of and current != path[0]:
+            visited.add(current)
+            following = [pixel for pixel in neighbors(current) if pixel != prev]
+            if not following:
+                break
+            prev, current = current, following[0]
+            path.append(current)
+        return path
+
+    paths = []
+    started = set()  # Пары (пиксель узла, первый шаг), с которых путь уже пройден
+    for pixel in sorted(node_of):
+        for step in neighbors(pixel):
+            if node_of.get(step) == node_of[pixel] or (pixel, step) in started:
+                continue
+            path = walk([pixel, step])
+            started.add((pixel, step))
+            started.add((path[-1], path[-2]))
+            paths.append(path)
+        if not neighbors(pixel):
+            paths.append([pixel])  # Точка
+
+    for pixel in sorted(pixels - visited - set(node_of)):
+        if pixel in visited:
+            continue
+        # Петля без концов и развилок (буква "O"): путь возвращается в начальный пиксель
+        visited.add(pixel)
+        paths.append(walk([pixel, neighbors(pixel)[0]]))
+
+    if distance is not None and paths:
+        paths = _simplify_graph(paths, node_of, {node_of[pixel] for pixel in junctions}, distance)
+    return paths
+
+
+def _simplify_graph(paths, node_of, junction_nodes, distance):
+    """Убирает следы утончения у развилок и сращивает пути, которые сходятся в узле попарно.
+
+    Отросток от развилки до свободного конца короче толщины штриха удаляется, а развилки,
+    соединенные таким коротким путем, сливаются в один узел. Затем пути через развилку,
+    где осталось ровно два конца, склеиваются в один; путь, оба конца которого пришли
+    в одну развилку, становится замкнутым.
+    """
+    merged = {}  # Узел -> узел, с которым он слит
+
+    def find(pixel):
+        node = node_of.get(pixel)
+        while node in merged:
+            node = merged[node]
+        return node
+
+    def is_short(path):
+        rows, cols = np.array(path).T
+        return len(path) < max(3, distance[rows, cols].max())
+
+    kept = []
+    for path in paths:
+        start, end = find(path[0]), find(path[-1])
+        start_junction, end_junction = start in junction_nodes, end in junction_nodes
+        if start == end or not is_short(path) or not (start_junction or end_junction):
+            kept.append(path)  # Длинный путь, петля или короткий отдельный штрих
+        elif start_junction and end_junction:
+            merged[end] = start  # Короткая перемычка между развилками
+        # Иначе это короткий отросток от развилки - он не сохраняется
+    paths = kept or [max(paths, key=len)]  # Область из одних коротких отростков - оставляем самый длинный
+
+    closed = []
+    while True:
+        ends = {}
+        for idx, path in enumerate(paths):
+            for side in (0, -1):
+                ends.setdefault(find(path[side]), []).append((idx, side))
+        pair = next((items for node, items in ends.items() if node in junction_nodes and len(items) == 2), None)
+        if pair is None:
+            return paths + closed
+        (first_idx, first_side), (second_idx, second_side) = pair
+        if first_idx == second_idx:
+            path = paths.pop(first_idx)
+            closed.append(path if path[0] == path[-1] else path + path[:1])
+            continue
+        first = paths[first_idx] if first_side == -1 else paths[first_idx][::-1]
+        second = paths[second_idx] if second_side == 0 else paths[second_idx][::-1]
+        paths = [path for idx, path in enumerate(paths) if idx not in (first_idx, second_idx)]
+        paths.append(first + second[1:] if first[-1] == second[0] else first + second)
+
+
+def fit_stroke(xs, ys, radii, tolerance=FIT_TOLERANCE):
+    """Точки кривой (x, y, radius) для выборки вдоль средней линии.
+
+    Кривая - сплайн через опорные точки упрощения Дугласа-Пекера: прямой штрих ровной
+    или равномерно сужающейся толщины получается из двух точек, изогнутый или с неравномерной
+    толщиной - из стольких, сколько нужно для tolerance.
+    """
+    samples = np.column_stack((xs, ys, radii))
+    if len(samples) < 3:
+        return [tuple(samples[0]), tuple(samples[-1])]
+    knots = _simplify(samples, tolerance)
+    return [tuple(point) for point in samples[knots].tolist()]
+
+
+def _simplify(points, tolerance):
+    """Номера опорных точек ломаной (x, y, radius) по Дугласу-Пекеру.
+
+    Отклонение точки - наибольшее из расстояния до хорды и отличия радиуса от радиуса,
+    линейно интерполированного вдоль хорды.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        chord = points[last, :2] - points[first, :2]
+        offsets = points[first + 1:last, :2] - points[first, :2]
+        length = np.hypot(*chord)
+        if length > 0:
+            distance = np.abs(offsets[:, 0] * chord[1] - offsets[:, 1] * chord[0]) / length
+            along = np.clip(offsets @ chord / length ** 2, 0, 1)
+        else:
+            distance = np.hypot(offsets[:, 0], offsets[:, 1])
+            along = np.full(len(offsets), 0.5)
+        radii = points[first, 2] + along * (points[last, 2] - points[first, 2])
+        distance = np.maximum(distance, np.abs(points[first + 1:last, 2] - radii))
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack.extend(((first, middle), (middle, last)))
+    return np.flatnonzero(keep)
+
+
+def _smooth(values, closed, width=5):
+    """Скользящее среднее вдоль пути; у замкнутого пути - по кругу"""
+    kernel = np.ones(width) / width
+    if not closed:
+        return np.convolve(np.pad(values, width // 2, mode="edge"), kernel, mode="valid")
+    smoothed = np.convolve(np.pad(values[:-1], width // 2, mode="wrap"), kernel, mode="valid")
+    return np.append(smoothed, smoothed[:1])
+
+
+def trace_component(mask, origin=(0, 0), tolerance=FIT_TOLERANCE):
+    """Кривые одной связной области (маска вырезки и положение её левого верхнего угла на изображении)"""
+    distance = distance_transform(mask)
+    skeleton = thin_corners(skeletonize(mask))
+    curves = []
+    for path in skeleton_paths(skeleton, distance):
+        rows, cols = np.array(path).T
+        radii = np.maximum(distance[rows, cols] - 0.5, MIN_RADIUS)
+        if len(path) > 4:
+            # Сглаживаем положение и ширину: на скелете они меняются ступеньками в пиксель
+            closed = path[0] == path[-1]
+            rows, cols, radii = (_smooth(values, closed) for values in (rows, cols, radii))
+        xs = cols + 0.5 + origin[0]
+        ys = rows + 0.5 + origin[1]
+        curves.append(fit_stroke(xs, ys, radii, tolerance))
+    return curves
+
+
+def _trace_task(args):
+    return trace_component(*args)
+
+
+def trace_image(image, min_area=MIN_AREA, tolerance=FIT_TOLERANCE, jobs=None):
+    """Трассирует все штрихи изображения; независимые области обрабатываются в отдельных процессах"""
+    mask = binarize(image)
+    labels, count = label_components(mask)
+    boxes, areas = component_boxes(labels, count)
+
+    tasks = []
+    for label, ((x0, y0, x1, y1), area) in enumerate(zip(boxes, areas), start=1):
+        if area >= min_area:
+            tasks.append((labels[y0:y1, x0:x1] == label, (x0, y0), tolerance))
+    # Крупные области вперед, чтобы процессы заканчивали одновременно
+    tasks.sort(key=lambda task: task[0].size, reverse=True)
+
+    if jobs == 1 or len(tasks) < 2 or mask.sum() < PARALLEL_MIN_PIXELS:
+        results = [_trace_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_trace_task, tasks,
+                                    chunksize=max(1, len(tasks) // (4 * (jobs or os.cpu_count() or 1)))))
+
+    # Порядок кривых - по положению областей (сверху вниз, слева направо)
+    order = sorted(range(len(tasks)), key=lambda idx: (tasks[idx][1][1], tasks[idx][1][0]))
+    return [curve for idx in order for curve in results[idx]]
@@ -0,0 +1,76 @@
+"""Пакетная отрисовка набора глифов в PNG без дисплея.
+
+Пример:
+    python batch_render.py font.fgp -o out --sizes 12 24 48 96 --jobs 8
+    python batch_render.py font.fgp -o out --sdf   # все размеры из одного поля расстояний на глиф
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from glyph import load_glyph_set
+from project_file import GlyphProject, is_project_file
+from rasterize import glyph_distance_field, render_distance_field, render_glyph
+
+DEFAULT_SIZES = (12, 24, 48, 96)
+
+
+def glyph_filename(name):
+    """Имя файла для глифа: коды символов, чтобы имена не зависели от регистра и спецсимволов"""
+    return "_".join(f"u{ord(char):04X}" for char in name) or "unnamed"
+
+
+def load_glyphs(path):
+    """Глифы из проекта (.fgp) или из JSON-набора"""
+    if is_project_file(path):
+        with GlyphProject.open(path) as project:
+            return [project.get(name) for name in project.names()]
+    return load_glyph_set(path)
+
+
+def render_task(glyph, sizes, output_dir, use_sdf=False):
+    """Отрисовывает один глиф во всех размерах (выполняется в отдельном процессе)"""
+    # Поле расстояний строится один раз в наибольшем размере, остальные размеры - его масштабированием
+    texture = glyph_distance_field(glyph, max(sizes)) if use_sdf else None
+    paths = []
+    for size in sizes:
+        size_dir = os.path.join(output_dir, str(size))
+        os.makedirs(size_dir, exist_ok=True)
+        path = os.path.join(size_dir, glyph_filename(glyph.name) + ".png")
+        image = render_distance_field(texture, size) if use_sdf else render_glyph(glyph, size)
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def render_glyph_set(glyphs, sizes, output_dir, jobs=None, use_sdf=False):
+    """Раздает глифы по процессам и возвращает пути всех записанных файлов"""
+    if jobs == 1:
+        results = [render_task(glyph, sizes, output_dir, use_sdf) for glyph in glyphs]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(render_task, glyphs, [sizes] * len(glyphs), [output_dir] * len(glyphs),
+                                    [use_sdf] * len(glyphs),
+                                    chunksize=max(1, len(glyphs) // (4 * (jobs or os.cpu_count() or 1)))))
+    return [path for paths in results for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная отрисовка набора глифов в PNG")
+    parser.add_argument("glyph_set", help="проект шрифта (.fgp) или JSON-набор глифов")
+    parser.add_argument("-o", "--output", default="rendered", help="папка для PNG (по подпапке на размер)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="высоты глифов в пикселях")
+    parser.add_argument("--jobs", type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    parser.add_argument("--sdf", action="store_true", help="отрисовывать все размеры из поля расстояний")
+    args = parser.parse_args(argv)
+
+    glyphs = load_glyphs(args.glyph_set)
+    paths = render_glyph_set(glyphs, args.sizes, args.output, args.jobs, args.sdf)
+    print(f"Отрисовано глифов: {len(glyphs)}, файлов: {len(paths)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""Воспроизводимые замеры отрисовки и поиска точек на синтетических глифах (без дисплея).
+
+Пример:
+    python benchmark.py -o results.json                       # замер и запись результатов
+    python benchmark.py --baseline baseline.json              # ошибка, если стало медленнее базовых
+    python benchmark.py --baseline baseline.json --update-baseline
+    python benchmark.py --tk                                  # плюс замеры через скрытое окно Tk
+"""
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from curve_store import CurveStore
+from frame_renderer import FrameRenderer, FrameSnapshot
+from glyph import Glyph
+from image_view import ImagePyramid
+from rasterize import render_glyph
+from spatial_index import PointIndex
+from stroke import DISPLAY_TOLERANCE, TessellationCache, curve_pieces, outline_pieces, subdivide_curves
+
+SEED = 1234
+CANVAS_SIZE = (600, 500)
+DEFAULT_STROKES = (10, 100)
+DEFAULT_POINTS = (4, 12)  # Точек на кривую (сплайн через точки)
+DEFAULT_RADII = (5,)
+DEFAULT_ZOOMS = (1.0, 4.0)
+DEFAULT_IMAGE_SIZES = (1000, 4000)
+HIT_QUERIES = 1000
+ZOOM_STEP = 1.2  # Шаг кнопок масштаба редактора
+THRESHOLD = 0.25  # Допустимое замедление относительно базовых результатов
+MIN_REGRESSION_MS = 0.5  # Меньшие разницы считаются шумом измерения
+
+
+def synthetic_curves(strokes, points, radius, extent, seed=SEED):
+    """Кривые (x, y, radius) со случайными точками в квадрате extent x extent; одинаковы при одном seed"""
+    rng = np.random.default_rng(seed)
+    curves = []
+    for _ in range(strokes):
+        start = rng.uniform(0.1, 0.9, 2) * extent
+        steps = rng.normal(0, extent * 0.05, (points, 2))
+        xy = np.clip(start + np.cumsum(steps, axis=0), 0, extent)
+        radii = np.clip(rng.normal(radius, radius * 0.3, points), 1, None)
+        curves.append([tuple(point) for point in np.column_stack((xy, radii)).tolist()])
+    return curves
+
+
+def synthetic_image(size, seed=SEED):
+    """Шумный серый фон size x size, похожий на скан"""
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(180, 255, (size, size), dtype=np.uint8), "L").convert("RGB")
+
+
+def measure(run, repeat, setup=None):
+    """Медиана и минимум времени run() в миллисекундах; setup() выполняется перед каждым запуском вне замера"""
+    if setup is not None:
+        setup()
+    run()  # Прогрев
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(times), "min_ms": min(times)}
+
+
+def curve_cases(args):
+    for strokes, points, radius in itertools.product(args.strokes, args.points, args.radii):
+        yield {"strokes": strokes, "points": points, "radius": radius}
+
+
+def bench_curves(args):
+    """Вычисление, тесселяция и поиск точек - без зависимости от фона"""
+    results = []
+    for params in curve_cases(args):
+        curves = synthetic_curves(params["strokes"], params["points"], params["radius"], 1000)
+        store = CurveStore.from_curves(curves)
+        indices = list(range(len(store)))
+
+        segments = [piece for curve in curves for piece in curve_pieces(curve)]
+        results.append(("subdivide", params, measure(
+            lambda: subdivide_curves(segments, DISPLAY_TOLERANCE, DISPLAY_TOLERANCE), args.repeat)))
+
+        for zoom in args.zooms:
+            cache = TessellationCache()
+            results.append(("tessellate", dict(params, zoom=zoom),
+                            measure(lambda: cache.get_many(store, indices, zoom), args.repeat, cache.clear)))
+
+            # Правка одной точки: заново разбиваются только зависящие от неё сегменты сплайна,
+            # контур и отпечатки строятся по всей кривой
+            cache.get_many(store, indices, zoom)
+            point = store.point(0, 0)
+            steps = itertools.count(1)
+
+            def edit():
+                # Каждый запуск сдвигает точку на новое место, иначе правка попала бы в кэш
+                store.set_point(0, 0, point[0] + next(steps), point[1], point[2])
+                cache.get_many(store, indices, zoom)
+            results.append(("tessellate_edit", dict(params, zoom=zoom), measure(edit, args.repeat)))
+            store.set_point(0, 0, *point)
+
+            tessellations = cache.get_many(store, indices, zoom)
+            results.append(("preview_coords", dict(params, zoom=zoom), measure(
+                lambda: [polygon.ravel().tolist()
+                         for t in tessellations for polygon in outline_pieces(t.outline, zoom, (0, 0))],
+                args.repeat)))
+
+        index = PointIndex()
+        rng = np.random.default_rng(SEED)
+        queries = rng.uniform(0, 1000, (HIT_QUERIES, 2)).tolist()
+        results.append(("index_rebuild", params, measure(lambda: index.rebuild(store), args.repeat)))
+        results.append(("hit_test", dict(params, queries=HIT_QUERIES),
+                        measure(lambda: [index.nearest(x, y) for x, y in queries], args.repeat)))
+
+        glyph = Glyph("bench", curves, (0, 0, 1000, 1000))
+        results.append(("rasterize", dict(params, size=96), measure(lambda: render_glyph(glyph, 96), args.repeat)))
+    return results
+
+
+def bench_frames(args):
+    """Сборка кадра левой панели (то, что делает update_image_display в фоновом потоке)"""
+    results = []
+    renderer_colors = ((0, 0, 255, 128), (255, 0, 0, 128), (255, 165, 0, 200))
+    for image_size in args.image_sizes:
+        pyramid = ImagePyramid(synthetic_image(image_size))
+        for params, zoom, mode in itertools.product(curve_cases(args), args.zooms, ("outline", "stamp", "sdf")):
+            store = CurveStore.from_curves(
+                synthetic_curves(params["strokes"], params["points"], params["radius"], image_size))
+            cache = TessellationCache()
+
+            def make_snapshot(zoom):
+                tessellations = cache.get_many(store, range(len(store)), zoom)
+                return FrameSnapshot(
+                    canvas_size=CANVAS_SIZE, zoom=zoom, offset=(0, 0), quality=False, stroke_mode=mode,
+                    pyramid=pyramid, committed=tuple(tessellations[1:]), active=tuple(tessellations[:1]),
+                    handles=store.frozen(), handles_key=(store.serial, store.revision), overlay=None,
+                )
+            snapshot = make_snapshot(zoom)
+            case = dict(params, zoom=zoom, mode=mode, image_size=image_size)
+            renderer = FrameRenderer(*renderer_colors)
+
+            # Первый кадр: передискретизируется фон и рисуются все слои
+            def cold_setup():
+                renderer.compositor.invalidate()
+                pyramid.invalidate()
+            results.append(("frame_cold", case, measure(lambda: renderer.render(snapshot), args.repeat, cold_setup)))
+
+            # Смена масштаба: кадры поочередно строятся для zoom и zoom * ZOOM_STEP, кэши слоев и фона не подходят
+            frames = itertools.cycle((make_snapshot(zoom * ZOOM_STEP), snapshot))
+            results.append(("frame_zoom", case, measure(lambda: renderer.render(next(frames)), args.repeat)))
+
+            # Перетаскивание: меняются только активная кривая и точки, остальные слои из кэша
+            def drag_setup():
+                renderer.compositor.invalidate("active_stroke")
+                renderer.compositor.invalidate("handles")
+            results.append(("frame_drag", case, measure(lambda: renderer.render(snapshot), args.repeat, drag_setup)))
+    return results
+
+
+def bench_tk(args):
+    """Замеры через скрытое окно редактора: предпросмотр на холсте Tk и поиск точки по щелчку"""
+    import tkinter as tk
+
+    from main import FontEditor
+
+    class Click:
+        def __init__(self, x, y):
+            self.x, self.y = x, y
+
+    root = tk.Tk()
+    root.withdraw()
+    results = []
+    try:
+        app = FontEditor(root)
+        app.original_image = app.display_image = synthetic_image(1000)
+        app.image_pyramid = ImagePyramid(app.display_image)
+        for params in curve_cases(args):
+            app.curves = CurveStore.from_curves(
+                synthetic_curves(params["strokes"], params["points"], params["radius"], 1000) + [[]])
+            app.rebuild_point_index()
+            app.preview_layer.clear()
+            results.append(("tk_update_preview", params, measure(app.update_preview, args.repeat,
+                                                                 app.preview_layer.clear)))
+
+            clicks = [Click(x, y) for x, y in app.curves.frozen()[:100, :2].tolist()]
+
+            def click_all():
+                for event in clicks:
+                    app.on_image_click(event)
+                    app.on_image_release(event)
+            results.append(("tk_click_hit_test", dict(params, clicks=len(clicks)), measure(click_all, args.repeat)))
+    finally:
+        root.destroy()
+    return results
+
+
+def result_key(name, params):
+    return name + "|" + json.dumps(params, sort_keys=True)
+
+
+def compare(results, baseline, threshold):
+    """Список замедлений относительно базовых результатов: (ключ, было, стало)"""
+    previous = {result_key(item["name"], item["params"]): item["median_ms"] for item in baseline["results"]}
+    regressions = []
+    for item in results:
+        key = result_key(item["name"], item["params"])
+        if key in previous:
+            before, after = previous[key], item["median_ms"]
+            if after > before * (1 + threshold) and after - before > MIN_REGRESSION_MS:
+                regressions.append((key, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры отрисовки и поиска точек на синтетических глифах")
+    parser.add_argument("-o", "--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", help="базовые результаты; при замедлении код возврата 1")
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты в файл --baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="допустимое замедление (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=5, help="запусков на замер")
+    parser.add_argument("--strokes", type=int, nargs="+", default=list(DEFAULT_STROKES), help="число кривых")
+    parser.add_argument("--points", type=int, nargs="+", default=list(DEFAULT_POINTS), help="точек на кривую")
+    parser.add_argument("--radii", type=float, nargs="+", default=list(DEFAULT_RADII), help="средний радиус")
+    parser.add_argument("--zooms", type=float, nargs="+", default=list(DEFAULT_ZOOMS), help="масштабы")
+    parser.add_argument("--image-sizes", type=int, nargs="+", default=list(DEFAULT_IMAGE_SIZES),
+                        help="стороны фонового изображения")
+    parser.add_argument("--tk", action="store_true", help="добавить замеры через скрытое окно Tk (нужен дисплей)")
+    args = parser.parse_args(argv)
+
+    raw = bench_curves(args) + bench_frames(args)
+    if args.tk:
+        raw += bench_tk(args)
+    results = [dict(name=name, params=params, **timing) for name, params, timing in raw]
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "tolerance_px": DISPLAY_TOLERANCE,
+        },
+        "results": results,
+    }
+
+    for item in results:
+        print(f"{item['name']:18} {item['median_ms']:10.2f} ms  {json.dumps(item['params'], sort_keys=True)}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for key, before, after in regressions:
+            print(f"ЗАМЕДЛЕНИЕ {key}: {before:.2f} -> {after:.2f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
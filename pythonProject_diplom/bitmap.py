@@ -0,0 +1,186 @@
+"""Операции над двоичными изображениями на NumPy: порог, связные области, расстояния и скелет"""
+import numpy as np
+from PIL import Image
+
+
+def to_grayscale(image):
+    """Яркость изображения (float32, 0..255); прозрачные области считаются белой бумагой"""
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        paper = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        paper.alpha_composite(image)
+        image = paper
+    return np.asarray(image.convert("L"), dtype=np.float32)
+
+
+def otsu_threshold(gray):
+    """Порог Оцу: максимизирует межклассовую дисперсию гистограммы яркости"""
+    histogram = np.bincount(np.clip(gray, 0, 255).astype(np.uint8).ravel(), minlength=256).astype(float)
+    levels = np.arange(256)
+    weight = np.cumsum(histogram)
+    total = weight[-1]
+    mean = np.cumsum(histogram * levels)
+    between = (mean[-1] * weight - mean * total) ** 2 / np.maximum(weight * (total - weight), 1e-12)
+    return float(np.argmax(between[:-1]))
+
+
+def binarize(image):
+    """Маска чернил: пиксели темнее порога Оцу (светлые штрихи на темном фоне тоже распознаются)"""
+    gray = to_grayscale(image)
+    mask = gray <= otsu_threshold(gray)
+    if mask.mean() > 0.5:
+        mask = ~mask  # Чернил не может быть больше, чем бумаги
+    return mask
+
+
+def label_components(mask):
+    """Связные области маски (8-связность): массив номеров (0 - фон) и число областей.
+
+    Маска разбивается на отрезки строк; отрезки соседних строк, касающиеся хотя бы углом,
+    объединяются распространением меньшего номера по ребрам - всё без обхода по пикселям.
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)  # Конец отрезка не включается
+    labels = np.zeros((height, width), dtype=np.int32)
+    if not len(run_rows):
+        return labels, 0
+
+    # Отрезок a строки r касается отрезка b строки r + 1, если start_b <= end_a и end_b >= start_a
+    stride = width + 2
+    start_keys = run_rows.astype(np.int64) * stride + run_starts
+    end_keys = run_rows.astype(np.int64) * stride + run_ends
+    first = np.searchsorted(end_keys, (run_rows + 1).astype(np.int64) * stride + run_starts, side="left")
+    last = np.searchsorted(start_keys, (run_rows + 1).astype(np.int64) * stride + run_ends, side="right")
+    counts = np.maximum(last - first, 0)
+    a = np.repeat(np.arange(len(run_rows)), counts)
+    b = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+
+    roots = np.arange(len(run_rows))
+    while True:
+        smaller = np.minimum(roots[a], roots[b])
+        updated = roots.copy()
+        np.minimum.at(updated, a, smaller)
+        np.minimum.at(updated, b, smaller)
+        updated = updated[updated]  # Сжатие путей
+        if np.array_equal(updated, roots):
+            break
+        roots = updated
+
+    _, run_labels = np.unique(roots, return_inverse=True)
+    labels.ravel()[np.flatnonzero(mask)] = np.repeat(run_labels + 1, run_ends - run_starts)
+    return labels, int(run_labels.max()) + 1
+
+
+def component_boxes(labels, count):
+    """Рамки областей (x0, y0, x1, y1; правая и нижняя границы не включаются) и площади в пикселях"""
+    rows, cols = np.nonzero(labels)
+    ids = labels[rows, cols] - 1
+    areas = np.bincount(ids, minlength=count)
+    x0 = np.full(count, labels.shape[1])
+    y0 = np.full(count, labels.shape[0])
+    x1 = np.zeros(count, dtype=int)
+    y1 = np.zeros(count, dtype=int)
+    np.minimum.at(x0, ids, cols)
+    np.minimum.at(y0, ids, rows)
+    np.maximum.at(x1, ids, cols + 1)
+    np.maximum.at(y1, ids, rows + 1)
+    return list(zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())), areas
+
+
+def distance_transform(mask):
+    """Точное евклидово расстояние от пикселей маски до ближайшего пикселя фона (за краем - фон).
+
+    Сначала по столбцам находится расстояние до фона по вертикали, затем по строкам
+    перебираются сдвиги k, пока k^2 меньше наибольшего текущего расстояния - их число
+    ограничено толщиной штрихов, а не размером изображения.
+    """
+    height, width = mask.shape
+    if not mask.any():
+        return np.zeros((height, width), dtype=np.float32)
+    rows = np.arange(height)[:, None]
+    above = np.maximum.accumulate(np.where(mask, -1, rows), axis=0)
+    below = np.minimum.accumulate(np.where(mask, height, rows)[::-1], axis=0)[::-1]
+    vertical = np.where(mask, np.minimum(rows - above, below - rows), 0).astype(np.float64)
+
+    # За левым и правым краем - фон
+    cols = np.arange(width)
+    squared = np.minimum(vertical ** 2, (np.minimum(cols + 1, width - cols) ** 2)[None, :])
+    vertical_squared = vertical ** 2
+    k = 1
+    while k < width and k * k < squared.max():
+        squared[:, :-k] = np.minimum(squared[:, :-k], vertical_squared[:, k:] + k * k)
+        squared[:, k:] = np.minimum(squared[:, k:], vertical_squared[:, :-k] + k * k)
+        k += 1
+    return np.sqrt(squared).astype(np.float32)
+
+
+def _neighbors(image):
+    """Соседи P2..P9 по часовой стрелке, начиная сверху, для внутренних пикселей дополненного изображения"""
+    return [
+        image[:-2, 1:-1], image[:-2, 2:], image[1:-1, 2:], image[2:, 2:],
+        image[2:, 1:-1], image[2:, :-2], image[1:-1, :-2], image[:-2, :-2],
+    ]
+
+
+def crossing_numbers(skeleton):
+    """Число соседей и число переходов 0 -> 1 по кругу соседей для каждого пикселя"""
+    image = np.pad(skeleton, 1).astype(np.uint8)
+    return _count_transitions(_neighbors(image))
+
+
+def _count_transitions(neighbors):
+    count = sum(neighbors)
+    transitions = sum((neighbors[i] == 0) & (neighbors[(i + 1) % 8] == 1) for i in range(8))
+    return count, transitions
+
+
+def skeletonize(mask):
+    """Утончение Чжана-Суня до линий толщиной в пиксель; каждый проход - операции над целым массивом"""
+    image = np.pad(mask, 1).astype(np.uint8)
+    while True:
+        changed = False
+        for step in (0, 1):
+            neighbors = _neighbors(image)
+            p2, p4, p6, p8 = neighbors[0::2]
+            count, transitions = _count_transitions(neighbors)
+            if step == 0:
+                sides = (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+            else:
+                sides = (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+            remove = (image[1:-1, 1:-1] == 1) & (count >= 2) & (count <= 6) & (transitions == 1) & sides
+            if remove.any():
+                image[1:-1, 1:-1][remove] = 0
+                changed = True
+        if not changed:
+            return image[1:-1, 1:-1].astype(bool)
+
+
+def thin_corners(skeleton):
+    """m-связный скелет: убирает угловые пиксели лесенок, без которых линия остается 8-связной.
+
+    Пиксель с двумя перпендикулярными прямыми соседями убирается, если от этого не меняется
+    связность соседей (число связности Йокои равно 1). Тогда у пикселей линии ровно два соседа,
+    а больше двух - только у развилок. Соседние пиксели не убираются одновременно: за проход
+    обрабатывается одно из четырех подмножеств пикселей с шагом 2 по строкам и столбцам.
+    """
+    image = np.pad(skeleton, 1).astype(np.uint8)
+    rows, cols = np.indices(skeleton.shape)
+    while True:
+        changed = False
+        for row_parity, col_parity in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            neighbors = _neighbors(image)
+            straight = neighbors[0::2]
+            corner = sum(straight[i] * straight[(i + 1) % 4] for i in range(4)) > 0
+            empty = [1 - neighbor for neighbor in neighbors]
+            connectivity = sum(empty[i] - empty[i] * empty[i + 1] * empty[(i + 2) % 8] for i in range(0, 8, 2))
+            remove = ((image[1:-1, 1:-1] == 1) & corner & (connectivity == 1)
+                      & (rows % 2 == row_parity) & (cols % 2 == col_parity))
+            if remove.any():
+                image[1:-1, 1:-1][remove] = 0
+                changed = True
+        if not changed:
+            return image[1:-1, 1:-1].astype(bool)
@@ -0,0 +1,36 @@
+"""Послойная сборка кадра: каждый слой кэшируется и перерисовывается только при изменении входных данных"""
+from profiler import profiler
+
+
+class LayerCompositor:
+    """Кэш слоев кадра (RGBA-изображений размером с холст) с ключами входных данных"""
+
+    def __init__(self):
+        self._layers = {}  # имя слоя -> (ключ, изображение или None)
+
+    def layer(self, name, key, render):
+        """Возвращает слой name; render() вызывается, только если ключ слоя изменился"""
+        if name in self._layers:
+            cached_key, image = self._layers[name]
+            if cached_key == key:
+                return image
+        with profiler.stage(name):
+            image = render()
+        self._layers[name] = (key, image)
+        return image
+
+    def composite(self, layers):
+        """Накладывает слои по порядку на копию первого; пустые слои (None) пропускаются"""
+        with profiler.stage("composite"):
+            frame = layers[0].copy()
+            for image in layers[1:]:
+                if image is not None:
+                    frame.alpha_composite(image)
+        return frame
+
+    def invalidate(self, name=None):
+        """Сбрасывает один слой или все слои"""
+        if name is None:
+            self._layers.clear()
+        else:
+            self._layers.pop(name, None)
@@ -0,0 +1,183 @@
+"""Хранилище контрольных точек глифа в непрерывных массивах NumPy"""
+import itertools
+
+import numpy as np
+
+# Ключи кривых уникальны для всех хранилищ: кэш тесселяции общий для рабочих мест разных глифов
+_curve_keys = itertools.count()
+_store_serials = itertools.count()
+
+
+class CurveStore:
+    """Все контрольные точки глифа: строки x, y, радиус и номер кривой для каждой точки.
+
+    Точки одной кривой лежат подряд, поэтому кривая - это представление массива (N x 3) без копирования,
+    правка точки меняет массив на месте, а вычисление кривых получает массивы напрямую.
+    Представления действительны до следующего добавления или удаления точек и кривых.
+    У каждой кривой есть постоянный ключ и счетчик изменений - по ним кэши узнают о правках.
+    """
+
+    def __init__(self, capacity=64):
+        self._xyr = np.empty((3, capacity))  # Строки: x, y, радиус
+        self._ids = np.empty(capacity, dtype=np.intp)  # Номер кривой каждой точки
+        self._size = 0
+        self._starts = [0]  # Начала кривых в массивах; последний элемент - число точек
+        self._keys = []  # Постоянные ключи кривых
+        self._revisions = []  # Счетчики изменений кривых
+        self.serial = next(_store_serials)  # Номер хранилища: вместе с revision однозначно задает состояние
+        self.revision = 0  # Счетчик любых изменений хранилища
+        self._frozen = None  # (ревизия, копия точек только для чтения)
+
+    @classmethod
+    def from_curves(cls, curves):
+        store = cls()
+        for curve in curves:
+            store.add_curve(curve)
+        return store
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, idx):
+        """Точки кривой (N x 3: x, y, радиус) - представление, а не копия"""
+        idx = range(len(self._keys))[idx]
+        return self._xyr[:, self._starts[idx]:self._starts[idx + 1]].T
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self._keys)))
+
+    @property
+    def xs(self):
+        return self._xyr[0, :self._size]
+
+    @property
+    def ys(self):
+        return self._xyr[1, :self._size]
+
+    @property
+    def radii(self):
+        return self._xyr[2, :self._size]
+
+    @property
+    def curve_ids(self):
+        return self._ids[:self._size]
+
+    def version(self, idx):
+        """(ключ, счетчик изменений) кривой - меняется при любой правке её точек"""
+        return self._keys[idx], self._revisions[idx]
+
+    def keys(self):
+        return list(self._keys)
+
+    def frozen(self):
+        """Копия всех точек (N x 3) только для чтения, например для фонового потока; пересоздается после правок"""
+        if self._frozen is None or self._frozen[0] != self.revision:
+            points = self._xyr[:, :self._size].T.copy()
+            points.setflags(write=False)
+            self._frozen = (self.revision, points)
+        return self._frozen[1]
+
+    def point(self, curve_idx, point_idx):
+        position = self._position(curve_idx, point_idx)
+        return tuple(self._xyr[:, position].tolist())
+
+    def set_point(self, curve_idx, point_idx, x, y, radius):
+        """Меняет точку на месте"""
+        self._xyr[:, self._position(curve_idx, point_idx)] = (x, y, radius)
+        self._touch(curve_idx)
+
+    def append_point(self, curve_idx, x, y, radius):
+        """Добавляет точку в конец кривой; для последней кривой обходится без сдвига массивов"""
+        self._insert(self._starts[curve_idx + 1], [(x, y, radius)], curve_idx)
+        self._shift_starts(curve_idx + 1, 1)
+        self._touch(curve_idx)
+
+    def pop_point(self, curve_idx):
+        """Удаляет и возвращает последнюю точку кривой"""
+        point = self.point(curve_idx, -1)
+        self._delete(self._starts[curve_idx + 1] - 1, 1)
+        self._shift_starts(curve_idx + 1, -1)
+        self._touch(curve_idx)
+        return point
+
+    def add_curve(self, points=()):
+        """Добавляет кривую в конец и возвращает её номер"""
+        return self.insert_curve(len(self._keys), points)
+
+    def insert_curve(self, idx, points=()):
+        """Вставляет кривую перед кривой idx; номера следующих кривых сдвигаются"""
+        points = list(points)
+        start = self._starts[idx]
+        self._insert(start, points, idx)
+        self._ids[start + len(points):self._size] += 1
+        self._starts.insert(idx, start)
+        self._shift_starts(idx + 1, len(points))
+        self._keys.insert(idx, next(_curve_keys))
+        self._revisions.insert(idx, 0)
+        self.revision += 1
+        return idx
+
+    def remove_curve(self, idx):
+        """Удаляет кривую и возвращает её точки [(x, y, radius), ...]"""
+        points = self.curve_points(idx)
+        start = self._starts[idx]
+        self._delete(start, len(points))
+        self._ids[start:self._size] -= 1
+        del self._starts[idx]
+        self._shift_starts(idx, -len(points))
+        del self._keys[idx]
+        del self._revisions[idx]
+        self.revision += 1
+        return points
+
+    def clear(self):
+        self._size = 0
+        self._starts = [0]
+        self._keys = []
+        self._revisions = []
+        self.revision += 1
+
+    def curve_points(self, idx):
+        return [tuple(point) for point in self[idx].tolist()]
+
+    def to_lists(self):
+        """Кривые в виде списков кортежей (x, y, radius)"""
+        return [self.curve_points(idx) for idx in range(len(self._keys))]
+
+    def _position(self, curve_idx, point_idx):
+        start, end = self._starts[curve_idx], self._starts[curve_idx + 1]
+        return start + range(end - start)[point_idx]
+
+    def _touch(self, curve_idx):
+        self._revisions[curve_idx] += 1
+        self.revision += 1
+
+    def _shift_starts(self, first, delta):
+        for idx in range(first, len(self._starts)):
+            self._starts[idx] += delta
+
+    def _insert(self, position, points, curve_idx):
+        """Раздвигает массивы с position и записывает точки кривой curve_idx"""
+        count = len(points)
+        if self._size + count > self._ids.size:
+            self._grow(self._size + count)
+        self._xyr[:, position + count:self._size + count] = self._xyr[:, position:self._size]
+        self._ids[position + count:self._size + count] = self._ids[position:self._size]
+        if count:
+            self._xyr[:, position:position + count] = np.asarray(points, dtype=float).T
+            self._ids[position:position + count] = curve_idx
+        self._size += count
+
+    def _delete(self, position, count):
+        self._xyr[:, position:self._size - count] = self._xyr[:, position + count:self._size]
+        self._ids[position:self._size - count] = self._ids[position + count:self._size]
+        self._size -= count
+
+    def _grow(self, required):
+        """Увеличивает емкость вдвое, чтобы добавление точек было в среднем O(1)"""
+        capacity = max(required, 2 * self._ids.size)
+        xyr = np.empty((3, capacity))
+        xyr[:, :self._size] = self._xyr[:, :self._size]
+        ids = np.empty(capacity, dtype=np.intp)
+        ids[:self._size] = self._ids[:self._size]
+        self._xyr, self._ids = xyr, ids
@@ -0,0 +1,159 @@
+"""Сборка кадра левой панели из неизменяемого снимка состояния редактора (без обращений к Tk)"""
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from compositor import LayerCompositor
+from profiler import profiler
+from sdf import coverage, distance_field, stroke_segments
+from stroke import outline_pieces
+
+# Снимок всего, что нужно для кадра; кривые передаются тесселяциями и копией контрольных точек
+FrameSnapshot = namedtuple("FrameSnapshot", [
+    "canvas_size", "zoom", "offset", "quality", "stroke_mode", "pyramid",
+    "committed",  # Тесселяции неизменяемых сейчас кривых
+    "active",  # Тесселяция редактируемой кривой (кортеж из 0 или 1 элемента)
+    "handles",  # Контрольные точки всех кривых: массив N x 3 (x, y, радиус) только для чтения
+    "handles_key",  # (номер хранилища, номер изменения) точек - ключ слоя точек
+    "overlay",  # None или ((x, y, radius) начальной точки соединения, (x, y) указателя на холсте)
+])
+
+
+def curve_stamps(tessellations):
+    """Все отпечатки кривых одним массивом N x 3 (x, y, радиус)"""
+    if not tessellations:
+        return np.empty((0, 3))
+    return np.concatenate([tessellation.stamps for tessellation in tessellations])
+
+
+class FrameRenderer:
+    """Строит кадр из кэшируемых слоев; работает только со снимком и годится для фонового потока"""
+
+    def __init__(self, curve_color, point_color, connect_color):
+        self.curve_color = curve_color
+        self.point_color = point_color
+        self.connect_color = connect_color
+        self.compositor = LayerCompositor()
+
+    def render(self, snapshot):
+        with profiler.frame("render"):
+            return self._render(snapshot)
+
+    def _render(self, snapshot):
+        view = (snapshot.zoom, snapshot.offset, snapshot.canvas_size)
+        pyramid = snapshot.pyramid
+
+        # Фон: передискретизируется только видимая часть; при панорамировании берется готовая область
+        if snapshot.quality and not pyramid.refined:
+            self.compositor.invalidate("background")
+        background = self.compositor.layer(
+            "background", view + (pyramid,),
+            lambda: pyramid.render(snapshot.canvas_size, snapshot.zoom, snapshot.offset, snapshot.quality)
+        )
+
+        # Редактируемая кривая - отдельный слой, чтобы перетаскивание не перерисовывало остальные
+        strokes = self.compositor.layer(
+            "strokes", view + (snapshot.stroke_mode, snapshot.committed),
+            lambda: self.render_strokes(snapshot, snapshot.committed)
+        )
+        active_stroke = self.compositor.layer(
+            "active_stroke", view + (snapshot.stroke_mode, snapshot.active),
+            lambda: self.render_strokes(snapshot, snapshot.active)
+        )
+        handles = self.compositor.layer(
+            "handles", view + (snapshot.handles_key,),
+            lambda: self.render_handles(snapshot)
+        )
+        overlay = self.compositor.layer(
+            "overlay", snapshot.overlay and view + snapshot.overlay,
+            lambda: self.render_connect_overlay(snapshot)
+        )
+
+        return self.compositor.composite([background, strokes, active_stroke, handles, overlay])
+
+    def render_strokes(self, snapshot, tessellations):
+        """Слой кривых Безье с переменной шириной"""
+        if not tessellations:
+            return None
+        layer = Image.new("RGBA", snapshot.canvas_size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        zoom, offset = snapshot.zoom, snapshot.offset
+
+        if snapshot.stroke_mode == "outline":
+            # Многоугольник-контур на кривую; петли - несколькими частями, чтобы не было дыр
+            for tessellation in tessellations:
+                for polygon in outline_pieces(tessellation.outline, zoom, offset):
+                    draw.polygon(polygon.ravel().tolist(), fill=self.curve_color, outline=self.curve_color)
+        elif snapshot.stroke_mode == "sdf":
+            # Сглаженные края по расстоянию до штрихов; считаются только плитки рядом со штрихами
+            segments = stroke_segments(tessellations)
+            profiler.count("sdf_segments", len(segments))
+            field = distance_field(segments, snapshot.canvas_size[0], snapshot.canvas_size[1],
+                                   zoom, offset, spread=1.0)
+            alpha = np.round(coverage(field) * self.curve_color[3]).astype(np.uint8)
+            layer = Image.new("RGBA", snapshot.canvas_size, self.curve_color)
+            layer.putalpha(Image.fromarray(alpha, "L"))
+        else:
+            # Эталонный режим: отпечаток круга на каждый пиксель длины
+            stamps = curve_stamps(tessellations)
+            profiler.count("stamps", len(stamps))
+            canvas_x = stamps[:, 0] * zoom + offset[0]
+            canvas_y = stamps[:, 1] * zoom + offset[1]
+            canvas_r = np.maximum(1, stamps[:, 2] * zoom)  # Не меньше 1 пикселя
+
+            for cx, cy, cr in zip(canvas_x.tolist(), canvas_y.tolist(), canvas_r.tolist()):
+                draw.ellipse(
+                    [cx - cr, cy - cr, cx + cr, cy + cr],
+                    fill=self.curve_color,
+                    outline=self.curve_color
+                )
+        return layer
+
+    def render_handles(self, snapshot):
+        """Слой контрольных точек (только в левом окне)"""
+        handles = snapshot.handles
+        if not len(handles):
+            return None
+        profiler.count("handles", len(handles))
+        layer = Image.new("RGBA", snapshot.canvas_size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        zoom, offset = snapshot.zoom, snapshot.offset
+
+        canvas_x = handles[:, 0] * zoom + offset[0]
+        canvas_y = handles[:, 1] * zoom + offset[1]
+        canvas_r = np.maximum(1, handles[:, 2] * zoom)  # Не меньше 1 пикселя
+        for cx, cy, cr in zip(canvas_x.tolist(), canvas_y.tolist(), canvas_r.tolist()):
+            draw.ellipse(
+                [cx - cr, cy - cr, cx + cr, cy + cr],
+                fill=self.point_color,
+                outline=(0, 0, 0, 255)  # Черная граница для видимости
+            )
+        return layer
+
+    def render_connect_overlay(self, snapshot):
+        """Слой временной линии соединения от выбранной точки к указателю мыши"""
+        if snapshot.overlay is None:
+            return None
+        layer = Image.new("RGBA", snapshot.canvas_size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        zoom, offset = snapshot.zoom, snapshot.offset
+        (x1, y1, r1), (canvas_x2, canvas_y2) = snapshot.overlay
+
+        canvas_x1 = (x1 * zoom) + offset[0]
+        canvas_y1 = (y1 * zoom) + offset[1]
+
+        # Рисуем линию с плавным изменением ширины
+        steps = 20
+        for i in range(steps):
+            t = i / (steps - 1)
+            x = canvas_x1 + (canvas_x2 - canvas_x1) * t
+            y = canvas_y1 + (canvas_y2 - canvas_y1) * t
+            radius = max(1, (r1 * zoom) * (1 - t * 0.5))  # Плавное уменьшение радиуса
+
+            draw.ellipse(
+                [x - radius, y - radius, x + radius, y + radius],
+                fill=self.connect_color,
+                outline=self.connect_color
+            )
+        return layer
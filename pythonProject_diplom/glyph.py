@@ -0,0 +1,69 @@
+"""Модель глифа без интерфейса: штрихи-сплайны переменной ширины и сохранение набора глифов"""
+import json
+
+from stroke import bezier_to_spline
+
+GLYPH_SET_FORMAT = "font-editor-glyphs"
+GLYPH_SET_VERSION = 2
+LEGACY_BEZIER_POINTS = 6  # В версии 1 кривая до 6 точек была одной кривой Безье, а не сплайном
+
+
+class Glyph:
+    """Глиф: имя, рамка (обычно размер исходного скана) и штрихи [(x, y, radius), ...]"""
+
+    def __init__(self, name, curves=(), box=None):
+        self.name = name
+        self.curves = [[tuple(point) for point in curve] for curve in curves]
+        self.box = tuple(box) if box is not None else None  # (x0, y0, x1, y1) в координатах изображения
+
+    def bounds(self):
+        """Габариты штрихов с учетом радиусов или None, если штрихов нет"""
+        points = [point for curve in self.curves for point in curve]
+        if not points:
+            return None
+        return (min(x - r for x, y, r in points), min(y - r for x, y, r in points),
+                max(x + r for x, y, r in points), max(y + r for x, y, r in points))
+
+    def frame(self):
+        """Рамка, в которую вписывается глиф при растеризации: явная или по габаритам"""
+        return self.box or self.bounds()
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "box": list(self.box) if self.box is not None else None,
+            "curves": [[list(point) for point in curve] for curve in self.curves],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data.get("curves", []), data.get("box"))
+
+
+def upgrade_curves(curves):
+    """Штрихи версии 1 в виде сплайнов: кривые Безье заменяются сплайнами по точкам на них"""
+    return [bezier_to_spline(curve) if 2 < len(curve) <= LEGACY_BEZIER_POINTS else curve for curve in curves]
+
+
+def load_glyph_set(path):
+    """Читает набор глифов из JSON-файла"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != GLYPH_SET_FORMAT:
+        raise ValueError(f"Неизвестный формат набора глифов: {path}")
+    glyphs = [Glyph.from_dict(item) for item in data["glyphs"]]
+    if data.get("version", 1) == 1:
+        for glyph in glyphs:
+            glyph.curves = upgrade_curves(glyph.curves)
+    return glyphs
+
+
+def save_glyph_set(path, glyphs):
+    """Записывает набор глифов в JSON-файл"""
+    data = {
+        "format": GLYPH_SET_FORMAT,
+        "version": GLYPH_SET_VERSION,
+        "glyphs": [glyph.to_dict() for glyph in glyphs],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
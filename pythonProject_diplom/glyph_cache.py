@@ -0,0 +1,55 @@
+"""Кэш растровых изображений глифов с ограничением по памяти (вытеснение давно не использованных)"""
+from collections import OrderedDict
+
+
+class GlyphBitmapCache:
+    """LRU-кэш изображений по ключу (глиф, версия глифа, размер) с бюджетом в байтах.
+
+    При обращении к новой версии глифа все изображения его старых версий удаляются сразу,
+    поэтому правка одного глифа не трогает записи остальных.
+    """
+
+    def __init__(self, budget_bytes=32 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.size_bytes = 0
+        self._entries = OrderedDict()  # (глиф, версия, размер) -> (изображение, байты); порядок - от старых
+        self._versions = {}  # глиф -> версия, изображения которой лежат в кэше
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, glyph_id, version, size, render):
+        """Изображение глифа; render() вызывается только при промахе"""
+        key = (glyph_id, version, size)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        if self._versions.get(glyph_id, version) != version:
+            self.invalidate(glyph_id)
+        self._versions[glyph_id] = version
+
+        image = render()
+        cost = image.width * image.height * len(image.getbands())
+        self._entries[key] = (image, cost)
+        self.size_bytes += cost
+        self._evict()
+        return image
+
+    def invalidate(self, glyph_id=None):
+        """Удаляет изображения одного глифа или все"""
+        if glyph_id is None:
+            self._entries.clear()
+            self._versions.clear()
+            self.size_bytes = 0
+            return
+        for key in [key for key in self._entries if key[0] == glyph_id]:
+            self.size_bytes -= self._entries.pop(key)[1]
+        self._versions.pop(glyph_id, None)
+
+    def _evict(self):
+        # Последняя добавленная запись остается, даже если одна превышает бюджет
+        while self.size_bytes > self.budget_bytes and len(self._entries) > 1:
+            key, (_, cost) = self._entries.popitem(last=False)
+            self.size_bytes -= cost
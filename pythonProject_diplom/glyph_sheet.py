@@ -0,0 +1,138 @@
+"""Лист образцов шрифта: поиск глифов на скане и отдельное рабочее место для каждого глифа"""
+import os
+
+import numpy as np
+from PIL import Image
+
+from autotrace import MIN_AREA
+from bitmap import binarize, component_boxes, label_components
+from curve_store import CurveStore
+from image_view import ImagePyramid
+
+MARGIN = 0.15  # Поля вокруг глифа при вырезании - доля высоты глифа
+
+
+def merge_boxes(boxes):
+    """Объединяет рамки частей одного глифа: точки над i и j, диакритику и вложенные части.
+
+    Небольшая часть (ниже половины медианной высоты) присоединяется к соседней, если они
+    перекрываются по горизонтали хотя бы на половину более узкой и разделены по вертикали
+    не больше чем на половину медианной высоты; части, рамки которых в основном
+    перекрываются, объединяются всегда.
+    """
+    if not boxes:
+        return []
+    array = np.array(boxes, dtype=float)
+    x0, y0, x1, y1 = array.T
+    heights = y1 - y0
+    median = np.median(heights)
+    overlap = np.minimum(x1[:, None], x1[None, :]) - np.maximum(x0[:, None], x0[None, :])
+    narrower = np.minimum((x1 - x0)[:, None], (x1 - x0)[None, :])
+    gap = np.maximum(y0[:, None], y0[None, :]) - np.minimum(y1[:, None], y1[None, :])
+    small = np.minimum(heights[:, None], heights[None, :]) < 0.5 * median
+    attached = (overlap >= 0.5 * narrower) & (gap <= 0.5 * median) & small
+    area = (x1 - x0) * heights
+    nested = np.maximum(overlap, 0) * np.maximum(-gap, 0) >= 0.5 * np.minimum(area[:, None], area[None, :])
+    linked = attached | nested
+
+    roots = list(range(len(boxes)))
+
+    def find(idx):
+        while roots[idx] != idx:
+            roots[idx] = roots[roots[idx]]
+            idx = roots[idx]
+        return idx
+
+    for a, b in zip(*np.nonzero(np.triu(linked, 1))):
+        roots[find(a)] = find(b)
+
+    groups = {}
+    for idx, box in enumerate(boxes):
+        groups.setdefault(find(idx), []).append(box)
+    return [(min(box[0] for box in group), min(box[1] for box in group),
+             max(box[2] for box in group), max(box[3] for box in group)) for group in groups.values()]
+
+
+def reading_order(boxes):
+    """Сортирует рамки по строкам сверху вниз и внутри строки слева направо"""
+    lines = []
+    for box in sorted(boxes, key=lambda box: box[1]):
+        if lines and (box[1] + box[3]) / 2 < lines[-1][0]:
+            lines[-1][1].append(box)
+            lines[-1][0] = max(lines[-1][0], box[3])
+        else:
+            lines.append([box[3], [box]])
+    return [box for _, line in lines for box in sorted(line, key=lambda box: box[0])]
+
+
+def segment_sheet(image, min_area=MIN_AREA, margin=MARGIN):
+    """Рамки глифов листа (x0, y0, x1, y1) в порядке чтения, с полями вокруг каждого глифа"""
+    mask = binarize(image)
+    labels, count = label_components(mask)
+    boxes, areas = component_boxes(labels, count)
+    glyph_boxes = reading_order(merge_boxes([box for box, area in zip(boxes, areas) if area >= min_area]))
+
+    width, height = image.size
+    padded = []
+    for x0, y0, x1, y1 in glyph_boxes:
+        pad = round((y1 - y0) * margin)
+        padded.append((max(0, x0 - pad), max(0, y0 - pad), min(width, x1 + pad), min(height, y1 + pad)))
+    return padded
+
+
+class GlyphWorkspace:
+    """Рабочее место одного глифа: свои кривые (в координатах вырезки), вид и лениво вырезанный фон"""
+
+    def __init__(self, sheet, name, box):
+        self.sheet = sheet
+        self.name = name
+        self.box = box  # (x0, y0, x1, y1) на листе
+        self.curves = CurveStore()
+        self.curves.add_curve()  # Текущая незавершенная кривая
+        self.zoom_level = 1.0
+        self.image_offset = [0, 0]
+        self._image = None
+        self._pyramid = None
+
+    @property
+    def image(self):
+        """Область глифа; вырезается из листа при первом обращении"""
+        if self._image is None:
+            self._image = self.sheet.image.crop(self.box)
+        return self._image
+
+    @property
+    def pyramid(self):
+        if self._pyramid is None:
+            self._pyramid = ImagePyramid(self.image)
+        return self._pyramid
+
+
+class GlyphSheet:
+    """Лист образцов: разбивается на глифы один раз при открытии, рабочие места создаются по запросу"""
+
+    def __init__(self, path, image, boxes):
+        self.path = path
+        self.image = image  # Лист декодируется один раз; глифы - его вырезки
+        self.boxes = boxes
+        stem = os.path.splitext(os.path.basename(path))[0]
+        self._names = [f"{stem}-{idx + 1:03d}" for idx in range(len(boxes))]
+        self._workspaces = {}
+
+    @classmethod
+    def open(cls, path, min_area=MIN_AREA, margin=MARGIN):
+        image = Image.open(path)
+        image.load()
+        return cls(path, image, segment_sheet(image, min_area, margin))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def names(self):
+        return list(self._names)
+
+    def workspace(self, name):
+        """Рабочее место глифа; создается при первом выборе и дальше хранит правки"""
+        if name not in self._workspaces:
+            self._workspaces[name] = GlyphWorkspace(self, name, self.boxes[self._names.index(name)])
+        return self._workspaces[name]
@@ -0,0 +1,296 @@
+"""Масштабирование исходного скана: пирамида уменьшенных копий и кэш видимой области"""
+import math
+import tempfile
+import threading
+
+import numpy as np
+from PIL import Image
+
+from profiler import profiler
+
+BACKGROUND_COLOR = (128, 128, 128, 0)  # Цвет холста вне изображения
+LARGE_IMAGE_PIXELS = 64_000_000  # Сканы больше (8000 x 8000) открываются через уменьшенную копию
+PROXY_SIDE = 4096  # Наибольшая сторона уменьшенной копии большого скана
+STRIP_HEIGHT = 256  # Строк скана, декодируемых в файл на диске за один шаг
+MAX_SCAN_PIXELS = 1_000_000_000  # Защита Pillow от "бомб" срабатывает уже на 90 Мпикс, а сканы бывают больше
+TILE_FIELDS = ("codec_name", "extents", "offset", "args", "_replace")  # Поля тайла Pillow 11+ (ImageFile._Tile)
+
+
+def open_image(path):
+    """Image.open для скана: предел защиты от "бомб" поднимается до MAX_SCAN_PIXELS только на время открытия"""
+    limit = Image.MAX_IMAGE_PIXELS
+    if limit is not None:
+        Image.MAX_IMAGE_PIXELS = max(limit, MAX_SCAN_PIXELS)
+    try:
+        return Image.open(path)
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+def tiff_strips(path, rows=STRIP_HEIGHT):
+    """Полосы несжатого TIFF по rows строк: (верхняя строка, изображение полосы) или None для других файлов.
+
+    Для каждой полосы в image.tile оставляются только байты её строк, а размер изображения
+    подменяется размером полосы, поэтому Pillow не создает буфер под весь скан.
+    Это опирается на внутреннее устройство Pillow 11+ (_Tile, _size, _tile_size); если его нет,
+    возвращается None, и скан декодируется целиком обычным image.load().
+    """
+    with open_image(path) as image:
+        if image.format != "TIFF" or image.tag_v2.get(284, 1) != 1:  # 284 - PlanarConfiguration
+            return None
+        tiles = list(image.tile)
+        width, height = image.size
+        bits = image.tag_v2.get(258, (1,))  # BitsPerSample
+        internals = hasattr(image, "_size") and hasattr(image, "_tile_size")
+    if not tiles or not internals or not all(hasattr(tile, field) for tile in tiles for field in TILE_FIELDS):
+        return None
+    if any(tile.codec_name != "raw" or tile.args[2] != 1 for tile in tiles):
+        return None  # Сжатие (libtiff) или строки снизу вверх - полосами не читается
+    bits_per_pixel = sum(bits) if isinstance(bits, tuple) else bits
+
+    def strips():
+        for top in range(0, height, rows):
+            bottom = min(height, top + rows)
+            band = []
+            for tile in tiles:
+                x0, y0, x1, y1 = tile.extents
+                first, last = max(y0, top), min(y1, bottom)
+                if first < last:
+                    row_bytes = tile.args[1] or (bits_per_pixel * (x1 - x0) + 7) // 8
+                    band.append(tile._replace(extents=(x0, first - top, x1, last - top),
+                                              offset=tile.offset + (first - y0) * row_bytes))
+            with open_image(path) as image:
+                image.tile = band
+                image._size = image._tile_size = (width, bottom - top)  # _tile_size - размер буфера TIFF в Pillow
+                image.load()
+                yield top, image.copy()
+    return strips()
+
+
+def full_strips(path, rows=STRIP_HEIGHT):
+    """Полосы скана, который декодируется целиком (PNG, сжатый TIFF и другие форматы)"""
+    with open_image(path) as image:
+        image.load()
+        width, height = image.size
+        for top in range(0, height, rows):
+            yield top, image.crop((0, top, width, min(height, top + rows)))
+
+
+def storage_mode(image):
+    """Режим хранения пикселей скана: без лишних каналов, прозрачность - только если она есть"""
+    if image.mode in ("1", "L", "I", "I;16", "F"):
+        return "L"
+    if "A" in image.getbands() or "transparency" in image.info:
+        return "RGBA"
+    return "RGB"
+
+
+class ScanTiles:
+    """Скан в полном разрешении в файле на диске (np.memmap); в память читаются только нужные области.
+
+    Файл заполняется при первом обращении к пикселям. Несжатый TIFF декодируется
+    по полосам; другие форматы декодируются целиком один раз и переписываются полосами,
+    после чего декодированное изображение освобождается.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open_image(path) as image:
+            self.size = image.size
+            self.mode = storage_mode(image)
+        self._pixels = None
+        self._file = None
+        self._lock = threading.Lock()  # Области читает и фоновый поток отрисовки
+
+    @property
+    def pixels(self):
+        with self._lock:
+            if self._pixels is None:
+                self._pixels = self._decode()
+            return self._pixels
+
+    def _decode(self):
+        width, height = self.size
+        shape = (height, width) if self.mode == "L" else (height, width, len(self.mode))
+        self._file = tempfile.TemporaryFile(prefix="scan-")
+        pixels = np.memmap(self._file, dtype=np.uint8, mode="w+", shape=shape)
+        for top, strip in tiff_strips(self.path) or full_strips(self.path):
+            strip = strip.convert(self.mode)
+            pixels[top:top + strip.size[1]] = np.asarray(strip)
+        pixels.flush()
+        return pixels
+
+    def read(self, box, step=1):
+        """Область (x0, y0, x1, y1) скана; step > 1 - каждый step-й пиксель (для масштабов меньше 1)"""
+        x0, y0, x1, y1 = box
+        return Image.fromarray(np.ascontiguousarray(self.pixels[y0:y1:step, x0:x1:step]), self.mode)
+
+    def image(self):
+        """Весь скан как изображение (для трассировки, которой нужно полное разрешение)"""
+        return Image.fromarray(np.asarray(self.pixels), self.mode)
+
+    def proxy(self, max_side=PROXY_SIDE):
+        """Уменьшенная копия со стороной не больше max_side.
+
+        JPEG сразу декодируется в уменьшенном виде (draft), без чтения полного разрешения;
+        остальные форматы уменьшаются полосами из файла на диске.
+        """
+        factor = math.ceil(max(self.size) / max_side)
+        with open_image(self.path) as image:
+            if image.format == "JPEG":
+                image.draft(self.mode, (math.ceil(self.size[0] / factor), math.ceil(self.size[1] / factor)))
+                proxy = image.convert(self.mode)
+                if max(proxy.size) > max_side:
+                    proxy.thumbnail((max_side, max_side), Image.LANCZOS)
+                return proxy
+
+        width, height = self.size
+        proxy = Image.new(self.mode, (math.ceil(width / factor), math.ceil(height / factor)))
+        rows = max(1, STRIP_HEIGHT // factor) * factor
+        for top in range(0, height, rows):
+            strip = self.read((0, top, width, min(height, top + rows)))
+            proxy.paste(strip.reduce(factor), (0, top // factor))
+        return proxy
+
+
+def open_scan(path, max_pixels=LARGE_IMAGE_PIXELS):
+    """Открывает скан: (изображение, пирамида).
+
+    Большой скан не декодируется в память целиком: пирамида строится от уменьшенной копии,
+    а при крупном масштабе видимая область читается с диска в полном разрешении.
+    Изображением большого скана служит эта уменьшенная копия; размер скана - pyramid.size.
+    Файл скана после открытия не остается открытым.
+    """
+    with open_image(path) as image:
+        if image.size[0] * image.size[1] <= max_pixels:
+            image.load()
+            return image, ImagePyramid(image)
+    tiles = ScanTiles(path)
+    proxy = tiles.proxy()
+    return proxy, ImagePyramid(proxy, full_size=tiles.size, source=tiles)
+
+
+def blank_scan(size, max_side=PROXY_SIDE):
+    """Белый фон размером size для глифа без своего скана: (изображение, пирамида).
+
+    Как и у большого скана, в памяти хранится только копия со стороной не больше max_side.
+    """
+    factor = max(1, math.ceil(max(size) / max_side))
+    image = Image.new("L", (math.ceil(size[0] / factor), math.ceil(size[1] / factor)), 255)
+    return image, ImagePyramid(image, full_size=tuple(size))
+
+
+class ImagePyramid:
+    """Пирамида изображения (каждый уровень вдвое меньше) и кэш отмасштабированной области вокруг окна"""
+
+    def __init__(self, image, margin=0.5, full_size=None, source=None):
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGBA")
+        self.levels = [image]
+        # Для большого скана levels[0] - уменьшенная копия, а source читает области в полном разрешении;
+        # размер и координаты (в том числе точек кривых) всегда относятся к полному разрешению
+        self.full_size = full_size or image.size
+        self.source = source
+        self.margin = margin  # Запас вокруг окна (в долях размера холста), чтобы панорамирование не требовало пересчета
+        self.refined = False  # True, если последний кадр построен с качественной передискретизацией
+        self._tile = None  # (масштаб, качество, прямоугольник в пикселях масштаба, изображение)
+
+    @property
+    def size(self):
+        return self.full_size
+
+    @property
+    def proxy_zoom(self):
+        """Масштаб уровня 0 относительно полного разрешения (1 для обычного скана)"""
+        return self.levels[0].size[0] / self.full_size[0]
+
+    def full_image(self):
+        """Скан в полном разрешении"""
+        return self.source.image() if self.source is not None else self.levels[0]
+
+    def level_for(self, zoom):
+        """Наименьший уровень пирамиды, разрешение которого не ниже требуемого для zoom"""
+        zoom /= self.proxy_zoom
+        idx = 0
+        while zoom * 2 ** (idx + 1) <= 1 and min(self.levels[idx].size) > 1:
+            if idx + 1 == len(self.levels):
+                self.levels.append(self.levels[idx].reduce(2))
+            idx += 1
+        return self.levels[idx]
+
+    def invalidate(self):
+        """Сбрасывает готовую отмасштабированную область; уровни пирамиды остаются"""
+        self._tile = None
+        self.refined = False
+
+    def render(self, canvas_size, zoom, offset, quality=True):
+        """Изображение размером с холст, в котором передискретизирована только видимая часть скана"""
+        canvas = Image.new("RGBA", canvas_size, BACKGROUND_COLOR)
+        width, height = self.size
+        scaled_size = (int(width * zoom), int(height * zoom))
+        offset_x, offset_y = int(offset[0]), int(offset[1])
+
+        # Видимая часть в пикселях отмасштабированного изображения
+        visible = (
+            max(0, -offset_x), max(0, -offset_y),
+            min(scaled_size[0], canvas_size[0] - offset_x), min(scaled_size[1], canvas_size[1] - offset_y),
+        )
+        if visible[0] >= visible[2] or visible[1] >= visible[3]:
+            return canvas
+
+        tile_box, tile_image = self._get_tile(zoom, scaled_size, visible, canvas_size, quality)
+        crop = tile_image.crop((
+            visible[0] - tile_box[0], visible[1] - tile_box[1],
+            visible[2] - tile_box[0], visible[3] - tile_box[1],
+        ))
+        canvas.paste(crop, (visible[0] + offset_x, visible[1] + offset_y))
+        return canvas
+
+    def _get_tile(self, zoom, scaled_size, visible, canvas_size, quality):
+        """Отмасштабированная область, покрывающая visible; при панорамировании берется из кэша"""
+        if self._tile is not None:
+            tile_zoom, tile_quality, box, image = self._tile
+            covers = (box[0] <= visible[0] and box[1] <= visible[1]
+                      and box[2] >= visible[2] and box[3] >= visible[3])
+            if tile_zoom == zoom and (tile_quality or not quality) and covers:
+                self.refined = tile_quality
+                return box, image
+
+        margin_x = int(canvas_size[0] * self.margin)
+        margin_y = int(canvas_size[1] * self.margin)
+        box = (
+            max(0, visible[0] - margin_x), max(0, visible[1] - margin_y),
+            min(scaled_size[0], visible[2] + margin_x), min(scaled_size[1], visible[3] + margin_y),
+        )
+
+        if self.source is not None and zoom > self.proxy_zoom:
+            level, source = self._read_source(zoom, box)
+        else:
+            level = self.level_for(zoom)
+            scale_x = level.size[0] / scaled_size[0]
+            scale_y = level.size[1] / scaled_size[1]
+            source = (box[0] * scale_x, box[1] * scale_y, box[2] * scale_x, box[3] * scale_y)
+        resample = Image.LANCZOS if quality else Image.BILINEAR
+        with profiler.stage("lanczos" if quality else "bilinear"):
+            image = level.resize((box[2] - box[0], box[3] - box[1]), resample, box=source)
+
+        self._tile = (zoom, quality, box, image)
+        self.refined = quality
+        return box, image
+
+    def _read_source(self, zoom, box):
+        """Область скана под box, прочитанная с диска, и прямоугольник box в её пикселях.
+
+        При масштабе меньше 1 читается каждый step-й пиксель, но не меньше двух на пиксель
+        экрана, чтобы размер прочитанной области оставался порядка размера холста.
+        """
+        step = max(1, int(1 / (2 * zoom)))
+        source = [coord / zoom for coord in box]
+        region = (
+            int(source[0]) // step * step, int(source[1]) // step * step,
+            min(self.full_size[0], math.ceil(source[2])), min(self.full_size[1], math.ceil(source[3])),
+        )
+        with profiler.stage("read_tiles"):
+            level = self.source.read(region, step)
+        return level, ((source[0] - region[0]) / step, (source[1] - region[1]) / step,
+                       (source[2] - region[0]) / step, (source[3] - region[1]) / step)
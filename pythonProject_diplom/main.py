@@ -1,8 +1,25 @@
+import argparse
+import math
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk, ImageDraw
-import math
+from PIL import ImageTk
+
+from autotrace import trace_image
+from curve_store import CurveStore
+from frame_renderer import FrameRenderer, FrameSnapshot
+from glyph import Glyph
+from glyph_cache import GlyphBitmapCache
+from glyph_sheet import GlyphSheet
+from image_view import blank_scan, open_scan
+from preview import PreviewLayer
+from profiler import profiler
+from project_file import GlyphProject, is_project_file
+from render_worker import RenderWorker
+from scheduler import FrameScheduler
+from spatial_index import PointIndex
+from stroke import TessellationCache
+from waterfall import SAMPLE_TEXT, render_waterfall
 
 
 class FontEditor:
@@ -17,14 +34,27 @@ class FontEditor:
         self.image_path = None
         self.original_image = None
         self.display_image = None
+        self.image_pyramid = None  # Пирамида масштабов для быстрой отрисовки фона
         self.image_tk = None
-        self.current_curve = []  # Текущая кривая: [(x, y, radius), ...]
-        self.all_curves = []  # Все кривые
+        # Контрольные точки всех кривых (x, y, radius); последняя кривая - текущая, незавершенная
+        self.curves = CurveStore()
+        self.curves.add_curve()
+        self.project = None  # Открытый проект шрифта (GlyphProject)
+        self.glyph_name = None  # Имя редактируемого глифа проекта
+        self.glyph_box = None  # Рамка глифа, если скан не загружен
+        self.sheet = None  # Открытый лист образцов (GlyphSheet)
+        self.workspace = None  # Рабочее место выбранного глифа листа
         self.selected_point = None
         self.zoom_level = 1.0
         self.preview_zoom = 1.0
         self.preview_offset = [0, 0]
         self.drag_start = None
+        self.tessellation_cache = TessellationCache()  # Кэш тесселяции кривых
+        self.point_index = PointIndex()  # Пространственный индекс контрольных точек
+        self.scheduler = FrameScheduler(self.root)  # Не более одной перерисовки за кадр
+        self.bitmap_cache = GlyphBitmapCache()  # Изображения глифов для образца текста
+        self.preview_text_mode = False  # Справа - образец текста вместо штрихов глифа
+        self.preview_tk = None
 
         # Переменные для перемещения изображения
         self.image_offset = [0, 0]
@@ -35,6 +65,8 @@ class FontEditor:
         self.point_operation = "add"  # 'add' - добавление, 'resize' - изменение размера
         self.connect_mode = False  # Режим соединения кривых
         self.connect_start_point = None  # Начальная точка для соединения
+        # 'outline' - контур штриха, 'stamp' - отпечатки кругов (эталон), 'sdf' - сглаженный по полю расстояний
+        self.stroke_mode = "outline"
 
         # Цвета и параметры
         self.min_radius = 1  # Минимальный размер круга 1 пиксель
@@ -45,8 +77,15 @@ class FontEditor:
         self.preview_color = "black"
         self.connect_color = (255, 165, 0, 200)  # Оранжевый для линий соединения
 
+        # Отрисовка кадров левой панели в фоновом потоке
+        self.frame_renderer = FrameRenderer(self.curve_color, self.point_color, self.connect_color)
+        self.render_worker = RenderWorker(self.root, self.frame_renderer.render, self.show_frame)
+
         # Создание интерфейса
         self.create_widgets()
+        self.preview_layer = PreviewLayer(self.preview_canvas, self.preview_color)
+        self.scheduler.add_view("image", self.update_image_display)
+        self.scheduler.add_view("preview", lambda quality: self.update_preview())
 
         # Привязка событий
         self.bind_events()
@@ -70,6 +109,15 @@ class FontEditor:
         self.load_btn = tk.Button(self.left_toolbar, text="Загрузить изображение", command=self.load_image)
         self.load_btn.pack(side=tk.LEFT, padx=5)
 
+        self.open_sheet_btn = tk.Button(self.left_toolbar, text="Открыть лист", command=self.open_sheet)
+        self.open_sheet_btn.pack(side=tk.LEFT, padx=5)
+
+        self.sheet_selector = ttk.Combobox(self.left_toolbar, state="readonly", width=12)
+        self.sheet_selector.pack(side=tk.LEFT, padx=5)
+
+        self.trace_btn = tk.Button(self.left_toolbar, text="Автотрассировка (T)", command=self.auto_trace)
+        self.trace_btn.pack(side=tk.LEFT, padx=5)
+
         self.zoom_in_btn = tk.Button(self.left_toolbar, text="+", command=lambda: self.adjust_zoom(1.2))
         self.zoom_in_btn.pack(side=tk.LEFT, padx=5)
 
@@ -116,12 +164,33 @@ class FontEditor:
                                           command=self.finish_current_curve)
         self.finish_curve_btn.pack(side=tk.LEFT, padx=5)
 
+        self.open_project_btn = tk.Button(self.right_toolbar, text="Открыть проект", command=self.open_project)
+        self.open_project_btn.pack(side=tk.LEFT, padx=5)
+
+        self.glyph_selector = ttk.Combobox(self.right_toolbar, state="readonly", width=10)
+        self.glyph_selector.pack(side=tk.LEFT, padx=5)
+
+        self.save_glyph_btn = tk.Button(self.right_toolbar, text="Сохранить глиф", command=self.save_glyph)
+        self.save_glyph_btn.pack(side=tk.LEFT, padx=5)
+
         self.preview_zoom_in = tk.Button(self.right_toolbar, text="+", command=lambda: self.adjust_preview_zoom(1.2))
         self.preview_zoom_in.pack(side=tk.LEFT, padx=5)
 
         self.preview_zoom_out = tk.Button(self.right_toolbar, text="-", command=lambda: self.adjust_preview_zoom(0.8))
         self.preview_zoom_out.pack(side=tk.LEFT, padx=5)
 
+        self.stroke_mode_btn = tk.Button(self.right_toolbar, text="Режим: контур (S)",
+                                         command=self.toggle_stroke_mode)
+        self.stroke_mode_btn.pack(side=tk.LEFT, padx=5)
+
+        self.text_mode_btn = tk.Button(self.right_toolbar, text="Образец текста", command=self.toggle_text_mode)
+        self.text_mode_btn.pack(side=tk.LEFT, padx=5)
+
+        self.sample_text = tk.StringVar(value=SAMPLE_TEXT)
+        self.sample_text.trace_add("write", lambda *args: self.scheduler.request("preview"))
+        self.sample_entry = tk.Entry(self.right_toolbar, textvariable=self.sample_text, width=20)
+        self.sample_entry.pack(side=tk.LEFT, padx=5)
+
     def bind_events(self):
         # События левой панели
         self.image_canvas.bind("<Button-1>", self.on_image_click)
@@ -130,15 +199,29 @@ class FontEditor:
         self.image_canvas.bind("<MouseWheel>", self.on_mouse_wheel)  # Изменение размера круга
 
         # Горячие клавиши
-        self.root.bind("<d>", lambda e: self.set_mode("draw"))
-        self.root.bind("<p>", lambda e: self.set_mode("pan"))
-        self.root.bind("<r>", lambda e: self.toggle_resize_mode())
-        self.root.bind("<c>", lambda e: self.toggle_connect_mode())
+        self.bind_hotkey("<d>", lambda: self.set_mode("draw"))
+        self.bind_hotkey("<p>", lambda: self.set_mode("pan"))
+        self.bind_hotkey("<r>", self.toggle_resize_mode)
+        self.bind_hotkey("<c>", self.toggle_connect_mode)
+        self.bind_hotkey("<s>", self.toggle_stroke_mode)
+        self.bind_hotkey("<t>", self.auto_trace)
+        self.root.bind("<F2>", lambda e: self.toggle_hud())
+        self.root.bind("<F3>", lambda e: self.toggle_trace())
 
         # События правой панели
         self.preview_canvas.bind("<Button-1>", self.start_pan)
         self.preview_canvas.bind("<B1-Motion>", self.pan_preview)
         self.preview_canvas.bind("<ButtonRelease-1>", self.stop_pan)
+        self.glyph_selector.bind("<<ComboboxSelected>>", self.on_glyph_selected)
+        self.sheet_selector.bind("<<ComboboxSelected>>", lambda e: self.show_workspace(self.sheet_selector.get()))
+
+    def bind_hotkey(self, key, action):
+        """Горячая клавиша-буква окна; не срабатывает, пока текст вводится в поле ввода"""
+        def handler(event):
+            if isinstance(event.widget, (tk.Entry, ttk.Entry)):
+                return
+            action()
+        self.root.bind(key, handler)
 
     def set_mode(self, mode):
         self.mode = mode
@@ -152,7 +235,7 @@ class FontEditor:
             self.connect_mode = False
             self.connect_start_point = None
             self.connect_btn.config(relief=tk.RAISED)
-            self.update_image_display()
+            self.scheduler.request("image")
 
     def toggle_resize_mode(self):
         self.point_operation = "resize" if self.point_operation == "add" else "add"
@@ -169,7 +252,43 @@ class FontEditor:
             self.connect_start_point = None
             self.connect_btn.config(relief=tk.RAISED)
 
-        self.update_image_display()
+        self.scheduler.request("image")
+
+    def toggle_stroke_mode(self):
+        modes = {"outline": "контур", "stamp": "отпечатки", "sdf": "сглаживание"}
+        order = list(modes)
+        self.stroke_mode = order[(order.index(self.stroke_mode) + 1) % len(order)]
+        self.stroke_mode_btn.config(text=f"Режим: {modes[self.stroke_mode]} (S)")
+        self.scheduler.request("image", "preview")
+
+    def toggle_text_mode(self):
+        self.preview_text_mode = not self.preview_text_mode
+        self.text_mode_btn.config(relief=tk.SUNKEN if self.preview_text_mode else tk.RAISED)
+        self.scheduler.request("preview")
+
+    def toggle_hud(self):
+        profiler.set_hud(not profiler.hud)
+        self.update_hud()
+
+    def toggle_trace(self):
+        """Начинает или заканчивает запись трассы кадров (открывается в chrome://tracing или Perfetto)"""
+        if profiler.tracing:
+            profiler.stop_trace()
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("Трасса", "*.json"), ("Все файлы", "*.*")])
+        if file_path:
+            try:
+                profiler.start_trace(file_path)
+            except OSError as e:
+                messagebox.showerror("Ошибка", f"Не удалось записать трассу: {e}")
+
+    def update_hud(self):
+        """Сводка времени кадров в углу левой панели"""
+        self.image_canvas.delete("hud")
+        if profiler.hud:
+            self.image_canvas.create_text(8, 8, anchor=tk.NW, text="\n".join(profiler.summary()),
+                                          fill="yellow", font=("Courier", 9), tags="hud")
 
     def load_image(self):
         file_path = filedialog.askopenfilename(
@@ -177,14 +296,208 @@ class FontEditor:
         if file_path:
             try:
                 self.image_path = file_path
-                self.original_image = Image.open(file_path)
-                self.display_image = self.original_image.copy()
+                # Большой скан открывается через уменьшенную копию; координаты точек - в полном разрешении
+                self.original_image, self.image_pyramid = open_scan(file_path)
+                self.close_sheet()
+                self.display_image = self.original_image
                 self.image_offset = [0, 0]
-                self.update_image_display()
+                self.scheduler.request("image")
                 self.zoom_level = 1.0
+                if self.image_pyramid.source is not None:
+                    # Большой скан открывается целиком в окне: первый кадр строится по уменьшенной копии,
+                    # а скан декодируется с диска только при приближении
+                    width, height = self.image_pyramid.size
+                    fit = min(self.image_canvas.winfo_width() / width, self.image_canvas.winfo_height() / height)
+                    self.zoom_level = min(self.image_pyramid.proxy_zoom, max(0.1, fit))
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось загрузить изображение: {str(e)}")
 
+    def open_sheet(self):
+        """Открывает лист образцов: глифы ищутся один раз, затем каждый правится в своем рабочем месте"""
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Изображения", "*.png;*.jpg;*.jpeg;*.bmp;*.tif"), ("Все файлы", "*.*")])
+        if not file_path:
+            return
+        try:
+            sheet = GlyphSheet.open(file_path)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть лист: {str(e)}")
+            return
+        if not len(sheet):
+            messagebox.showinfo("Лист образцов", "На листе не найдено ни одного глифа")
+            return
+
+        self.close_sheet()
+        self.sheet = sheet
+        self.image_path = file_path
+        self.sheet_selector.config(values=sheet.names())
+        self.show_workspace(sheet.names()[0])
+
+    def close_sheet(self):
+        self.detach_workspace()
+        self.sheet = None
+        self.sheet_selector.config(values=[])
+
+    def detach_workspace(self):
+        """Отвязывает редактор от рабочего места листа; кривые и вид остаются в рабочем месте"""
+        if self.workspace is None:
+            return
+        # Кривые и вид хранятся в рабочем месте до следующего выбора этого глифа
+        self.workspace.curves = self.curves
+        self.workspace.zoom_level = self.zoom_level
+        self.workspace.image_offset = list(self.image_offset)
+        self.workspace = None
+        self.glyph_name = None  # Имя было именем глифа листа
+        self.sheet_selector.set("")
+
+    def show_workspace(self, name):
+        """Переключает редактор на глиф листа; вырезается и масштабируется только область этого глифа"""
+        if self.sheet is None or (self.workspace is not None and self.workspace.name == name):
+            return
+        if self.workspace is not None:
+            self.detach_workspace()
+        elif self.project is not None and self.glyph_name is not None:
+            self.project.put(self.current_glyph())  # Несохранённые правки глифа проекта остаются в проекте
+            self.glyph_selector.set("")
+
+        workspace = self.sheet.workspace(name)
+        self.workspace = workspace
+        self.original_image = workspace.image
+        self.display_image = workspace.image
+        self.image_pyramid = workspace.pyramid
+        self.curves = workspace.curves
+        self.zoom_level = workspace.zoom_level
+        self.image_offset = list(workspace.image_offset)
+        self.glyph_name = name
+        self.glyph_box = None
+        self.selected_point = None
+        self.connect_start_point = None
+        self.sheet_selector.set(name)
+        self.rebuild_point_index()
+        self.scheduler.request("image", "preview")
+
+    def auto_trace(self):
+        """Трассирует загруженный скан; найденные штрихи добавляются как обычные редактируемые кривые"""
+        if not self.original_image:
+            return
+        self.root.config(cursor="watch")
+        self.root.update_idletasks()
+        try:
+            curves = trace_image(self.image_pyramid.full_image())
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось трассировать изображение: {str(e)}")
+            return
+        finally:
+            self.root.config(cursor="")
+
+        # Текущая незавершенная кривая остается последней
+        current_idx = self.current_curve_idx()
+        for offset, curve in enumerate(curves):
+            self.curves.insert_curve(current_idx + offset, curve)
+        self.rebuild_point_index()
+        self.scheduler.request("image", "preview")
+
+    def current_glyph_name(self):
+        """Имя редактируемого глифа: выбранный глиф проекта или листа, иначе имя файла скана"""
+        if self.glyph_name is not None:
+            return self.glyph_name
+        return os.path.splitext(os.path.basename(self.image_path))[0] if self.image_path else "glyph"
+
+    def current_glyph(self):
+        """Глиф из текущих кривых; рамка глифа проекта сохраняется, новый глиф получает размер скана"""
+        if self.glyph_name is not None and self.workspace is None:
+            box = self.glyph_box
+        else:
+            box = (0, 0) + self.image_pyramid.size if self.image_pyramid is not None else None
+        return Glyph(self.current_glyph_name(), [curve for curve in self.curves.to_lists() if len(curve) >= 2], box)
+
+    def waterfall_glyph(self, char):
+        """Глиф для символа образца: редактируемый глиф или глиф проекта с таким именем"""
+        if char == self.current_glyph_name():
+            return char, ("editor", self.curves.serial, self.curves.revision), self.current_glyph
+        if self.project is not None and char in self.project:
+            return char, ("project", self.project.version(char)), lambda: self.project.get(char)
+        return None
+
+    def save_glyph(self):
+        """Сохраняет текущий глиф в проект; в файл дописываются только изменённые глифы"""
+        try:
+            if self.project is None:
+                file_path = filedialog.asksaveasfilename(
+                    defaultextension=".fgp", filetypes=[("Проект шрифта", "*.fgp"), ("Все файлы", "*.*")])
+                if not file_path:
+                    return
+                if os.path.exists(file_path) and is_project_file(file_path):
+                    # Глиф добавляется в существующий проект, остальные глифы файла сохраняются
+                    self.project = GlyphProject.open(file_path)
+                    self.bitmap_cache.invalidate()
+                else:
+                    self.project = GlyphProject(file_path)
+            glyph = self.current_glyph()
+            self.project.put(glyph)
+            self.project.save()
+            self.glyph_name = glyph.name
+            self.glyph_box = glyph.box
+            self.glyph_selector.config(values=self.project.names())
+            self.glyph_selector.set(glyph.name)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить глиф: {str(e)}")
+
+    def open_project(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Проект шрифта", "*.fgp"), ("Все файлы", "*.*")])
+        if file_path:
+            try:
+                project = GlyphProject.open(file_path)  # Читается только индекс глифов
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось открыть проект: {str(e)}")
+                return
+            if self.project is not None:
+                self.project.close()
+            self.project = project
+            self.bitmap_cache.invalidate()  # Те же имена глифов в другом проекте - другие глифы
+            self.glyph_name = None
+            self.glyph_selector.config(values=self.project.names())
+            self.glyph_selector.set("")
+
+    def on_glyph_selected(self, event):
+        """Переключает редактор на выбранный глиф проекта (декодируется только он)"""
+        name = self.glyph_selector.get()
+        if self.project is None or (name == self.glyph_name and self.workspace is None):
+            return
+        if self.workspace is not None:
+            # Глиф листа остается в своем рабочем месте и не попадает в проект без сохранения
+            self.detach_workspace()
+        elif self.glyph_name is not None:
+            self.project.put(self.current_glyph())  # Несохранённые правки остаются в проекте
+        elif self.current_glyph().curves:
+            # Кривые, нарисованные по скану, еще не принадлежат ни одному глифу
+            glyph = self.current_glyph()
+            answer = messagebox.askyesnocancel(
+                "Несохранённые кривые", f"Добавить нарисованные кривые в проект как глиф «{glyph.name}»?")
+            if answer is None:
+                self.glyph_selector.set("")
+                return
+            if answer:
+                self.project.put(glyph)
+                self.glyph_selector.config(values=self.project.names())
+                self.glyph_selector.set(name)
+
+        glyph = self.project.get(name)
+        self.glyph_name = name
+        self.glyph_box = glyph.box
+        # Скан или лист предыдущего глифа не относится к этому глифу: фоном становится чистая рамка глифа
+        frame = glyph.frame()
+        size = (max(1, math.ceil(frame[2])), max(1, math.ceil(frame[3]))) if frame else \
+            (self.image_canvas.winfo_width(), self.image_canvas.winfo_height())
+        self.original_image, self.image_pyramid = blank_scan(size)
+        self.display_image = self.original_image
+        self.image_path = None
+        self.curves = CurveStore.from_curves(glyph.curves + [[]])
+        self.selected_point = None
+        self.connect_start_point = None
+        self.rebuild_point_index()
+        self.scheduler.request("image", "preview")
+
     def on_image_click(self, event):
         if not self.original_image:
             return
@@ -193,63 +506,58 @@ class FontEditor:
             x = (event.x - self.image_offset[0]) / self.zoom_level
             y = (event.y - self.image_offset[1]) / self.zoom_level
 
-            # Проверка на клик по точке
-            for curve_idx, curve in enumerate(self.all_curves + [self.current_curve]):
-                for point_idx, (px, py, radius) in enumerate(curve):
-                    canvas_px = (px * self.zoom_level) + self.image_offset[0]
-                    canvas_py = (py * self.zoom_level) + self.image_offset[1]
-                    distance = math.sqrt((event.x - canvas_px) ** 2 + (event.y - canvas_py) ** 2)
-
-                    if distance <= radius * self.zoom_level:
-                        if self.connect_mode:
-                            if self.connect_start_point is None:
-                                # Выбираем первую точку для соединения
-                                self.connect_start_point = (curve_idx, point_idx)
-                            else:
-                                # Соединяем точки
-                                start_curve, start_point = self.connect_start_point
-                                end_curve, end_point = (curve_idx, point_idx)
-
-                                # Проверяем, что точки из разных кривых
-                                if start_curve != end_curve:
-                                    # Получаем координаты точек
-                                    if start_curve < len(self.all_curves):
-                                        x1, y1, r1 = self.all_curves[start_curve][start_point]
-                                    else:
-                                        x1, y1, r1 = self.current_curve[start_point]
-
-                                    if end_curve < len(self.all_curves):
-                                        x2, y2, r2 = self.all_curves[end_curve][end_point]
-                                    else:
-                                        x2, y2, r2 = self.current_curve[end_point]
-
-                                    # Создаем новую кривую-соединение
-                                    avg_radius = (r1 + r2) / 2
-                                    connection_curve = [
-                                        (x1, y1, r1),
-                                        ((x1 + x2) / 2, (y1 + y2) / 2, avg_radius),
-                                        (x2, y2, r2)
-                                    ]
-                                    self.all_curves.append(connection_curve)
-
-                                # Сбрасываем режим соединения
-                                self.connect_start_point = None
-                                self.connect_mode = False
-                                self.connect_btn.config(relief=tk.RAISED)
-                        else:
-                            self.selected_point = (curve_idx, point_idx)
-                        self.update_image_display()
-                        return
+            # Проверка на клик по точке (поиск в пространственном индексе)
+            hit = self.point_index.nearest(x, y)
+            if hit is not None:
+                curve_idx, point_idx = hit
+                if self.connect_mode:
+                    if self.connect_start_point is None:
+                        # Выбираем первую точку для соединения
+                        self.connect_start_point = (curve_idx, point_idx)
+                    else:
+                        # Соединяем точки
+                        start_curve, start_point = self.connect_start_point
+                        end_curve, end_point = (curve_idx, point_idx)
+
+                        # Проверяем, что точки из разных кривых
+                        if start_curve != end_curve:
+                            # Получаем координаты точек
+                            x1, y1, r1 = self.curves.point(start_curve, start_point)
+                            x2, y2, r2 = self.curves.point(end_curve, end_point)
+
+                            # Создаем новую кривую-соединение
+                            avg_radius = (r1 + r2) / 2
+                            connection_curve = [
+                                (x1, y1, r1),
+                                ((x1 + x2) / 2, (y1 + y2) / 2, avg_radius),
+                                (x2, y2, r2)
+                            ]
+                            self.curves.insert_curve(self.current_curve_idx(), connection_curve)
+                            # Номер текущей кривой сдвинулся - перестраиваем индекс
+                            self.rebuild_point_index()
+
+                        # Сбрасываем режим соединения
+                        self.connect_start_point = None
+                        self.connect_mode = False
+                        self.connect_btn.config(relief=tk.RAISED)
+                else:
+                    self.selected_point = (curve_idx, point_idx)
+                    self.scheduler.begin_interaction()
+                self.scheduler.request("image")
+                return
 
             # Добавление новой точки
-            if not self.connect_mode and self.point_operation == "add" and len(
-                    self.current_curve) < 6:  # До 6 точек для 5-й степени
-                self.current_curve.append((x, y, self.default_radius))
-                self.update_image_display()
-                self.update_preview()
+            # Число точек не ограничено: кривая - сплайн через точки, новая точка меняет только конец кривой
+            current_idx = self.current_curve_idx()
+            if not self.connect_mode and self.point_operation == "add":
+                self.curves.append_point(current_idx, x, y, self.default_radius)
+                self.point_index.insert((current_idx, len(self.curves[current_idx]) - 1),
+                                        x, y, self.default_radius)
+                self.scheduler.request("image", "preview")
 
         elif self.mode == "pan":
             self.image_drag_start = (event.x, event.y)
+            self.scheduler.begin_interaction()
 
     def on_image_drag(self, event):
         if self.mode == "draw" and self.selected_point is not None:
@@ -257,15 +565,11 @@ class FontEditor:
             y = (event.y - self.image_offset[1]) / self.zoom_level
 
             curve_idx, point_idx = self.selected_point
-            if curve_idx < len(self.all_curves):
-                old_x, old_y, radius = self.all_curves[curve_idx][point_idx]
-                self.all_curves[curve_idx][point_idx] = (x, y, radius)
-            else:
-                old_x, old_y, radius = self.current_curve[point_idx]
-                self.current_curve[point_idx] = (x, y, radius)
+            radius = self.curves.point(curve_idx, point_idx)[2]
+            self.curves.set_point(curve_idx, point_idx, x, y, radius)
+            self.point_index.update(self.selected_point, x, y, radius)
 
-            self.update_image_display()
-            self.update_preview()
+            self.scheduler.request("image", "preview")
 
         elif self.mode == "pan" and self.image_drag_start:
             dx = event.x - self.image_drag_start[0]
@@ -274,250 +578,152 @@ class FontEditor:
 
             self.image_offset[0] += dx
             self.image_offset[1] += dy
-            self.update_image_display()
+            self.scheduler.request("image")
 
     def on_mouse_wheel(self, event):
         if self.mode == "draw" and self.selected_point is not None:
             # Изменение размера выбранной точки
             delta = 1 if event.delta > 0 else -1
             curve_idx, point_idx = self.selected_point
+            x, y, radius = self.curves.point(curve_idx, point_idx)
+            new_radius = max(self.min_radius, min(radius + delta, self.max_radius))
+            self.curves.set_point(curve_idx, point_idx, x, y, new_radius)
+            self.point_index.update(self.selected_point, x, y, new_radius)
 
-            if curve_idx < len(self.all_curves):
-                x, y, radius = self.all_curves[curve_idx][point_idx]
-                new_radius = max(self.min_radius, min(radius + delta, self.max_radius))
-                self.all_curves[curve_idx][point_idx] = (x, y, new_radius)
-            else:
-                x, y, radius = self.current_curve[point_idx]
-                new_radius = max(self.min_radius, min(radius + delta, self.max_radius))
-                self.current_curve[point_idx] = (x, y, new_radius)
-
-            self.update_image_display()
-            self.update_preview()
+            self.scheduler.request("image", "preview")
 
     def on_image_release(self, event):
         self.selected_point = None
         self.image_drag_start = None
+        self.scheduler.end_interaction()
+
+    def current_curve_idx(self):
+        """Номер текущей (незавершенной) кривой - она всегда последняя"""
+        return len(self.curves) - 1
 
-    def bezier_point(self, points, t):
-        """Вычисляет точку на кривой Безье для заданного t (0-1)"""
-        n = len(points) - 1
-        x, y = 0.0, 0.0
-        for i, (px, py) in enumerate(points):
-            # Биномиальный коэффициент
-            coeff = math.comb(n, i) * (1 - t) ** (n - i) * t ** i
-            x += px * coeff
-            y += py * coeff
-        return x, y
-
-    def bezier_radius(self, radii, t):
-        """Вычисляет радиус на кривой Безье для заданного t (0-1)"""
-        n = len(radii) - 1
-        r = 0.0
-        for i, radius in enumerate(radii):
-            # Биномиальный коэффициент
-            coeff = math.comb(n, i) * (1 - t) ** (n - i) * t ** i
-            r += radius * coeff
-        return r
-
-    def update_image_display(self):
+    def rebuild_point_index(self):
+        self.point_index.rebuild(self.curves)
+
+    def tessellate_curves(self, zoom, indices=None):
+        """Возвращает тесселяции кривых (по умолчанию всех) с точностью для масштаба zoom"""
+        if indices is None:
+            indices = range(len(self.curves))
+            self.tessellation_cache.prune(self.curves)
+        return self.tessellation_cache.get_many(
+            self.curves, [idx for idx in indices if len(self.curves[idx]) >= 2], zoom)
+
+    def update_image_display(self, quality=False):
         if self.display_image:
-            width, height = self.display_image.size
-            new_width = int(width * self.zoom_level)
-            new_height = int(height * self.zoom_level)
-
-            resized_image = self.display_image.resize((new_width, new_height), Image.LANCZOS)
-
-            canvas_width = self.image_canvas.winfo_width()
-            canvas_height = self.image_canvas.winfo_height()
-            offset_image = Image.new("RGBA", (canvas_width, canvas_height), (128, 128, 128, 0))
-            offset_image.paste(resized_image, (int(self.image_offset[0]), int(self.image_offset[1])))
-
-            draw = ImageDraw.Draw(offset_image)
-
-            # Отрисовка кривых Безье с переменной шириной
-            for curve in self.all_curves + [self.current_curve if len(self.current_curve) >= 2 else []]:
-                if len(curve) < 2:
-                    continue
-
-                # Создаем список точек для кривой Безье
-                points = [(p[0], p[1]) for p in curve]
-                radii = [p[2] for p in curve]
-
-                # Рисуем кривую Безье с переменной шириной
-                steps = 20
-                for i in range(steps):
-                    t1 = i / steps
-                    t2 = (i + 1) / steps
-
-                    # Вычисляем точки на кривой Безье
-                    x1, y1 = self.bezier_point(points, t1)
-                    x2, y2 = self.bezier_point(points, t2)
-                    r1 = self.bezier_radius(radii, t1)
-                    r2 = self.bezier_radius(radii, t2)
-
-                    # Преобразуем координаты с учетом масштаба и смещения
-                    canvas_x1 = (x1 * self.zoom_level) + self.image_offset[0]
-                    canvas_y1 = (y1 * self.zoom_level) + self.image_offset[1]
-                    canvas_x2 = (x2 * self.zoom_level) + self.image_offset[0]
-                    canvas_y2 = (y2 * self.zoom_level) + self.image_offset[1]
-                    canvas_r1 = max(1, r1 * self.zoom_level)  # Не меньше 1 пикселя
-                    canvas_r2 = max(1, r2 * self.zoom_level)
-
-                    # Рисуем сегмент кривой с плавным изменением ширины
-                    segment_steps = max(3, int(math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)))
-                    for j in range(segment_steps):
-                        t = j / (segment_steps - 1)
-                        x = x1 + (x2 - x1) * t
-                        y = y1 + (y2 - y1) * t
-                        radius = r1 + (r2 - r1) * t
-
-                        cx = (x * self.zoom_level) + self.image_offset[0]
-                        cy = (y * self.zoom_level) + self.image_offset[1]
-                        cr = max(1, radius * self.zoom_level)  # Не меньше 1 пикселя
-
-                        draw.ellipse(
-                            [cx - cr, cy - cr, cx + cr, cy + cr],
-                            fill=self.curve_color,
-                            outline=self.curve_color
-                        )
-
-            # Отрисовка контрольных точек (только в левом окне)
-            for curve in self.all_curves + [self.current_curve]:
-                for x, y, radius in curve:
-                    cx = (x * self.zoom_level) + self.image_offset[0]
-                    cy = (y * self.zoom_level) + self.image_offset[1]
-                    cr = max(1, radius * self.zoom_level)  # Не меньше 1 пикселя
-
-                    draw.ellipse(
-                        [cx - cr, cy - cr, cx + cr, cy + cr],
-                        fill=self.point_color,
-                        outline=(0, 0, 0, 255)  # Черная граница для видимости
-                    )
-
-            # Отрисовка линии соединения в режиме соединения
+            # Редактируемая кривая рисуется отдельным слоем, чтобы перетаскивание не перерисовывало остальные
+            active_idx = self.selected_point[0] if self.selected_point is not None else self.current_curve_idx()
+            with profiler.stage("tessellate"):
+                self.tessellation_cache.prune(self.curves)
+                committed = self.tessellate_curves(
+                    self.zoom_level, [idx for idx in range(len(self.curves)) if idx != active_idx])
+                active = self.tessellate_curves(self.zoom_level, [active_idx])
+
+            # Линия соединения тянется к текущему положению мыши
+            overlay = None
             if self.connect_mode and self.connect_start_point is not None:
                 curve_idx, point_idx = self.connect_start_point
-                if curve_idx < len(self.all_curves):
-                    x1, y1, r1 = self.all_curves[curve_idx][point_idx]
-                else:
-                    x1, y1, r1 = self.current_curve[point_idx]
-
-                # Получаем текущую позицию мыши
-                mouse_x = (self.root.winfo_pointerx() - self.root.winfo_rootx() -
-                           self.image_canvas.winfo_x() - self.image_offset[0]) / self.zoom_level
-                mouse_y = (self.root.winfo_pointery() - self.root.winfo_rooty() -
-                           self.image_canvas.winfo_y() - self.image_offset[1]) / self.zoom_level
-
-                # Рисуем временную линию соединения
-                canvas_x1 = (x1 * self.zoom_level) + self.image_offset[0]
-                canvas_y1 = (y1 * self.zoom_level) + self.image_offset[1]
-                canvas_x2 = (mouse_x * self.zoom_level) + self.image_offset[0]
-                canvas_y2 = (mouse_y * self.zoom_level) + self.image_offset[1]
-
-                # Рисуем линию с плавным изменением ширины
-                steps = 20
-                for i in range(steps):
-                    t = i / (steps - 1)
-                    x = canvas_x1 + (canvas_x2 - canvas_x1) * t
-                    y = canvas_y1 + (canvas_y2 - canvas_y1) * t
-                    radius = max(1, (r1 * self.zoom_level) * (1 - t * 0.5))  # Плавное уменьшение радиуса
-
-                    draw.ellipse(
-                        [x - radius, y - radius, x + radius, y + radius],
-                        fill=self.connect_color,
-                        outline=self.connect_color
-                    )
-
-            self.image_tk = ImageTk.PhotoImage(offset_image)
-            self.image_canvas.delete("all")
-            self.image_canvas.create_image(0, 0, anchor=tk.NW, image=self.image_tk)
+                pointer = (self.root.winfo_pointerx() - self.root.winfo_rootx() - self.image_canvas.winfo_x(),
+                           self.root.winfo_pointery() - self.root.winfo_rooty() - self.image_canvas.winfo_y())
+                overlay = (self.curves.point(curve_idx, point_idx), pointer)
+
+            # Кадр строится в фоновом потоке по неизменяемому снимку состояния
+            self.render_worker.submit(FrameSnapshot(
+                canvas_size=(self.image_canvas.winfo_width(), self.image_canvas.winfo_height()),
+                zoom=self.zoom_level,
+                offset=tuple(self.image_offset),
+                quality=quality,
+                stroke_mode=self.stroke_mode,
+                pyramid=self.image_pyramid,
+                committed=tuple(committed),
+                active=tuple(active),
+                handles=self.curves.frozen(),
+                handles_key=(self.curves.serial, self.curves.revision),
+                overlay=overlay,
+            ))
+
+    def show_frame(self, frame):
+        """Выводит готовый кадр на холст (вызывается в главном потоке)"""
+        with profiler.frame("show"):
+            with profiler.stage("photoimage"):
+                self.image_tk = ImageTk.PhotoImage(frame)
+            with profiler.stage("canvas"):
+                self.image_canvas.delete("all")
+                self.image_canvas.create_image(0, 0, anchor=tk.NW, image=self.image_tk)
+        self.update_hud()
 
     def reset_image_offset(self):
         self.image_offset = [0, 0]
-        self.update_image_display()
+        self.scheduler.request("image")
 
     def finish_current_curve(self):
-        if len(self.current_curve) >= 2:
-            self.all_curves.append(self.current_curve.copy())
-            self.current_curve = []
-            self.update_image_display()
-            self.update_preview()
+        if len(self.curves[self.current_curve_idx()]) >= 2:
+            self.curves.add_curve()  # Новая пустая текущая кривая
+            self.scheduler.request("image", "preview")
 
     def undo_last_point(self):
-        if self.current_curve:
-            self.current_curve.pop()
-            self.update_image_display()
-            self.update_preview()
-        elif self.all_curves:
-            self.current_curve = self.all_curves.pop()
+        current_idx = self.current_curve_idx()
+        if len(self.curves[current_idx]):
+            self.curves.pop_point(current_idx)
+            self.point_index.remove((current_idx, len(self.curves[current_idx])))
+            self.scheduler.request("image", "preview")
+        elif current_idx > 0:
+            self.curves.remove_curve(current_idx)  # Предыдущая кривая снова становится текущей
             self.undo_last_point()
 
     def clear_curves(self):
-        self.all_curves = []
-        self.current_curve = []
-        self.update_image_display()
-        self.update_preview()
+        self.curves.clear()
+        self.curves.add_curve()
+        self.tessellation_cache.clear()
+        self.point_index.clear()
+        self.scheduler.request("image", "preview")
 
     def adjust_zoom(self, factor):
         self.zoom_level *= factor
         self.zoom_level = max(0.1, min(self.zoom_level, 10.0))
-        self.update_image_display()
+        self.scheduler.request("image")
 
     def reset_zoom(self):
         self.zoom_level = 1.0
-        self.update_image_display()
+        self.scheduler.request("image")
 
     def update_preview(self, *args):
-        self.preview_canvas.delete("all")
-
-        for curve in self.all_curves + [self.current_curve if len(self.current_curve) >= 2 else []]:
-            if len(curve) < 2:
-                continue
-
-            # Создаем список точек для кривой Безье
-            points = [(p[0], p[1]) for p in curve]
-            radii = [p[2] for p in curve]
-
-            # Рисуем кривую Безье с переменной шириной (без точек в правом окне)
-            steps = 20
-            for i in range(steps):
-                t1 = i / steps
-                t2 = (i + 1) / steps
-
-                # Вычисляем точки на кривой Безье
-                x1, y1 = self.bezier_point(points, t1)
-                x2, y2 = self.bezier_point(points, t2)
-                r1 = self.bezier_radius(radii, t1)
-                r2 = self.bezier_radius(radii, t2)
-
-                # Преобразуем координаты для предпросмотра
-                px1 = (x1 * self.preview_zoom) + self.preview_offset[0]
-                py1 = (y1 * self.preview_zoom) + self.preview_offset[1]
-                px2 = (x2 * self.preview_zoom) + self.preview_offset[0]
-                py2 = (y2 * self.preview_zoom) + self.preview_offset[1]
-                pr1 = max(1, r1 * self.preview_zoom)  # Не меньше 1 пикселя
-                pr2 = max(1, r2 * self.preview_zoom)
-
-                # Рисуем сегмент кривой с плавным изменением ширины
-                segment_steps = max(3, int(math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)))
-                for j in range(segment_steps):
-                    t = j / (segment_steps - 1)
-                    x = px1 + (px2 - px1) * t
-                    y = py1 + (py2 - py1) * t
-                    radius = pr1 + (pr2 - pr1) * t
-
-                    self.preview_canvas.create_oval(
-                        x - radius, y - radius, x + radius, y + radius,
-                        fill=self.preview_color, outline=""
-                    )
+        # Рисуем штрихи с переменной шириной (без точек в правом окне),
+        # пересоздаются только элементы изменившихся кривых
+        if self.preview_text_mode:
+            # Образец текста: заново растеризуются только изменившиеся глифы
+            self.preview_layer.clear()
+            with profiler.stage("waterfall"):
+                image = render_waterfall(self.sample_text.get(), self.waterfall_glyph, self.bitmap_cache,
+                                         max(1, self.preview_canvas.winfo_width()))
+            with profiler.stage("photoimage"):
+                self.preview_tk = ImageTk.PhotoImage(image)
+            self.preview_canvas.delete("waterfall")
+            self.preview_canvas.create_image(0, 0, anchor=tk.NW, image=self.preview_tk, tags="waterfall")
+            self.update_hud()
+            return
+        self.preview_canvas.delete("waterfall")
+
+        # Элементы холста Tk не сглаживаются, поэтому в режиме 'sdf' справа рисуется контур
+        mode = "stamp" if self.stroke_mode == "stamp" else "outline"
+        with profiler.stage("tessellate"):
+            tessellations = self.tessellate_curves(self.preview_zoom)
+        with profiler.stage("canvas_items"):
+            self.preview_layer.update(tessellations, mode, self.preview_zoom, self.preview_offset)
+        profiler.count("items", self.preview_layer.item_count)
+        self.update_hud()
 
     def adjust_preview_zoom(self, factor):
         self.preview_zoom *= factor
         self.preview_zoom = max(0.1, min(self.preview_zoom, 10.0))
-        self.update_preview()
+        self.scheduler.request("preview")
 
     def start_pan(self, event):
         self.drag_start = (event.x, event.y)
+        self.scheduler.begin_interaction()
 
     def pan_preview(self, event):
         if self.drag_start:
@@ -527,13 +733,25 @@ class FontEditor:
 
             self.preview_offset[0] += dx
             self.preview_offset[1] += dy
-            self.update_preview()
+            self.scheduler.request("preview")
 
     def stop_pan(self, event):
         self.drag_start = None
+        self.scheduler.end_interaction()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Редактор шрифтов")
+    parser.add_argument("--trace", metavar="PATH", help="записать трассу кадров (JSON для chrome://tracing)")
+    parser.add_argument("--hud", action="store_true", help="показать время кадров поверх холста (F2)")
+    args = parser.parse_args()
+    if args.trace:
+        profiler.start_trace(args.trace)
+    profiler.set_hud(args.hud)
+
     root = tk.Tk()
     app = FontEditor(root)
-    root.mainloop()
\ No newline at end of file
+    try:
+        root.mainloop()
+    finally:
+        profiler.stop_trace()
\ No newline at end of file
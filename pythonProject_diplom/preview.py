@@ -0,0 +1,82 @@
+"""Сохраняемый слой предпросмотра: элементы холста создаются один раз и обновляются на месте"""
+import numpy as np
+
+from stroke import outline_pieces
+
+
+class PreviewLayer:
+    """Держит по одному элементу холста на штрих или на часть контура петли (в режиме отпечатков - набор овалов)"""
+
+    TAG = "stroke"
+
+    def __init__(self, canvas, color):
+        self.canvas = canvas
+        self.color = color
+        self.zoom = 1.0
+        self.offset = (0, 0)
+        self._strokes = []  # [(тесселяция, режим, [id элементов холста]), ...]
+
+    def update(self, tessellations, mode, zoom, offset):
+        """Приводит элементы холста к списку тесселяций, пересоздавая только изменившиеся штрихи"""
+        self.set_view(zoom, offset)
+
+        for idx, tessellation in enumerate(tessellations):
+            if idx < len(self._strokes):
+                old_tessellation, old_mode, items = self._strokes[idx]
+                if old_tessellation is tessellation and old_mode == mode:
+                    continue
+                pieces = self._outline_coords(tessellation) if old_mode == mode == "outline" else None
+                if pieces is not None and len(pieces) == len(items):
+                    # Контур из того же числа частей меняет только координаты многоугольников
+                    for item, coords in zip(items, pieces):
+                        self.canvas.coords(item, coords)
+                else:
+                    self.canvas.delete(*items)
+                    items = self._create_items(tessellation, mode)
+                self._strokes[idx] = (tessellation, mode, items)
+            else:
+                self._strokes.append((tessellation, mode, self._create_items(tessellation, mode)))
+
+        for _, _, items in self._strokes[len(tessellations):]:
+            self.canvas.delete(*items)
+        del self._strokes[len(tessellations):]
+
+    @property
+    def item_count(self):
+        return sum(len(items) for _, _, items in self._strokes)
+
+    def set_view(self, zoom, offset):
+        """Панорамирование и масштаб одним преобразованием всех элементов вместо перестроения"""
+        if zoom != self.zoom:
+            factor = zoom / self.zoom
+            self.canvas.scale(self.TAG, self.offset[0], self.offset[1], factor, factor)
+        dx = offset[0] - self.offset[0]
+        dy = offset[1] - self.offset[1]
+        if dx or dy:
+            self.canvas.move(self.TAG, dx, dy)
+        self.zoom = zoom
+        self.offset = (offset[0], offset[1])
+
+    def clear(self):
+        self.canvas.delete(self.TAG)
+        self._strokes = []
+
+    def _outline_coords(self, tessellation):
+        pieces = outline_pieces(tessellation.outline, self.zoom, self.offset)
+        return [polygon.ravel().tolist() for polygon in pieces]
+
+    def _create_items(self, tessellation, mode):
+        if mode == "outline":
+            return [self.canvas.create_polygon(coords, fill=self.color, outline="", tags=self.TAG)
+                    for coords in self._outline_coords(tessellation)]
+
+        stamps = tessellation.stamps
+        preview_x = stamps[:, 0] * self.zoom + self.offset[0]
+        preview_y = stamps[:, 1] * self.zoom + self.offset[1]
+        preview_r = np.maximum(1, stamps[:, 2] * self.zoom)  # Не меньше 1 пикселя
+
+        return [
+            self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius,
+                                    fill=self.color, outline="", tags=self.TAG)
+            for x, y, radius in zip(preview_x.tolist(), preview_y.tolist(), preview_r.tolist())
+        ]
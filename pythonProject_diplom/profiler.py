@@ -0,0 +1,154 @@
+"""Замеры времени этапов кадра: сводка поверх холста и запись трассы для chrome://tracing или Perfetto"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+HISTORY = 60  # Кадров каждого вида для среднего времени
+
+
+class FrameRecord:
+    """Замер одного кадра: общее время, время этапов и счетчики (в миллисекундах и штуках)"""
+
+    __slots__ = ("name", "start", "total", "stages", "counts")
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.total = 0.0
+        self.stages = {}
+        self.counts = {}
+
+
+class FrameProfiler:
+    """Хуки вокруг кадров и их этапов; выключенный профилировщик почти ничего не стоит.
+
+    Кадры и этапы привязаны к потоку, поэтому этапы фонового потока отрисовки
+    не смешиваются с этапами главного потока Tk.
+    """
+
+    def __init__(self):
+        self.enabled = False  # Замеры идут, пока показана сводка или пишется трасса
+        self.hud = False
+        self._local = threading.local()
+        self._history = {}  # имя кадра -> deque последних FrameRecord
+        self._lock = threading.Lock()
+        self._trace = None
+        self._trace_threads = set()
+        self._origin = time.perf_counter()
+
+    def set_hud(self, visible):
+        self.hud = visible
+        self._update_enabled()
+
+    def start_trace(self, path):
+        """Начинает запись трассы (формат Trace Event: JSON-массив событий)"""
+        self.stop_trace()
+        with self._lock:
+            self._trace = open(path, "w", encoding="utf-8")
+            self._trace.write("[\n")
+            self._trace_threads = set()
+        self._update_enabled()
+
+    def stop_trace(self):
+        with self._lock:
+            if self._trace is not None:
+                self._trace.write("{}]\n")  # Пустое событие вместо висячей запятой
+                self._trace.close()
+                self._trace = None
+        self._update_enabled()
+
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+    def _update_enabled(self):
+        self.enabled = self.hud or self._trace is not None
+
+    @contextmanager
+    def frame(self, name):
+        """Замер кадра вида name; внутри него этапы и счетчики относятся к этому кадру"""
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        record = FrameRecord(name, time.perf_counter())
+        stack.append(record)
+        try:
+            yield
+        finally:
+            stack.pop()
+            record.total = (time.perf_counter() - record.start) * 1000
+            with self._lock:
+                self._history.setdefault(name, deque(maxlen=HISTORY)).append(record)
+            self._write_event(name, "frame", record.start, record.total, record.counts)
+
+    @contextmanager
+    def stage(self, name):
+        """Замер этапа текущего кадра; повторные этапы с одним именем суммируются"""
+        stack = self._stack() if self.enabled else None
+        if not stack:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            stages = stack[-1].stages
+            stages[name] = stages.get(name, 0.0) + duration
+            self._write_event(name, "stage", start, duration)
+
+    def count(self, name, value):
+        """Счетчик текущего кадра (число отпечатков, элементов холста, событий)"""
+        stack = self._stack() if self.enabled else None
+        if stack:
+            counts = stack[-1].counts
+            counts[name] = counts.get(name, 0) + value
+
+    def summary(self):
+        """Строки сводки: последний кадр каждого вида, среднее время, этапы и счетчики"""
+        with self._lock:
+            history = {name: list(records) for name, records in self._history.items()}
+        lines = []
+        for name in sorted(history):
+            records = history[name]
+            last = records[-1]
+            average = sum(record.total for record in records) / len(records)
+            stages = "  ".join(f"{stage} {duration:.1f}" for stage, duration in last.stages.items())
+            lines.append(f"{name:8} {last.total:6.1f} мс (ср. {average:5.1f})  {stages}")
+            if last.counts:
+                lines.append(" " * 9 + "  ".join(f"{counter}: {value}" for counter, value in last.counts.items()))
+        return lines
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _write_event(self, name, category, start, duration_ms, args=None):
+        if self._trace is None:
+            return
+        thread = threading.current_thread()
+        event = {
+            "name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+            "ts": round((start - self._origin) * 1e6, 1), "dur": round(duration_ms * 1000, 1),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            if self._trace is None:
+                return
+            if thread.ident not in self._trace_threads:
+                # Имена потоков для просмотрщика трассы
+                self._trace_threads.add(thread.ident)
+                self._trace.write(json.dumps({"name": "thread_name", "ph": "M", "pid": os.getpid(),
+                                              "tid": thread.ident, "args": {"name": thread.name}}) + ",\n")
+            self._trace.write(json.dumps(event) + ",\n")
+
+
+# Общий профилировщик редактора: хуки в модулях отрисовки обращаются к нему напрямую
+profiler = FrameProfiler()
@@ -0,0 +1,218 @@
+"""Компактный двоичный файл проекта с множеством глифов и ленивой загрузкой через mmap.
+
+Формат (little-endian):
+    заголовок: magic "FEGP", версия u32, число глифов u32, смещение индекса u64, длина индекса u64
+    данные глифов: u32 число кривых, u32[число кривых] число точек, float32[точки x 3] (x, y, radius)
+    индекс: на глиф - u16 длина имени, имя UTF-8, u8 есть ли рамка, float32[4] рамка,
+            u64 смещение данных, u64 длина данных
+
+Каждая кривая - сплайн через свои точки; файлы версии 1, где кривые до 6 точек были
+кривыми Безье, читаются с преобразованием и при сохранении переписываются целиком.
+
+Индекс лежит после данных. При сохранении изменённые глифы и новый индекс дописываются
+в конец файла, а затем переписывается заголовок, так что неизменённые глифы не перезаписываются.
+"""
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from glyph import Glyph, upgrade_curves
+
+MAGIC = b"FEGP"
+VERSION = 2
+HEADER = struct.Struct("<4sIIQQ")
+INDEX_ENTRY = struct.Struct("<B4fQQ")
+COMPACT_RATIO = 0.5  # Доля мусора (старых копий глифов), при которой файл переписывается целиком
+
+
+def is_project_file(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def encode_glyph(glyph):
+    """Двоичное представление штрихов глифа"""
+    counts = np.array([len(curve) for curve in glyph.curves], dtype="<u4")
+    points = np.array([point for curve in glyph.curves for point in curve], dtype="<f4").reshape(-1, 3)
+    return struct.pack("<I", len(counts)) + counts.tobytes() + points.tobytes()
+
+
+def decode_curves(buffer, offset):
+    """Штрихи глифа из буфера (mmap) без копирования всего файла"""
+    (curve_count,) = struct.unpack_from("<I", buffer, offset)
+    counts = np.frombuffer(buffer, dtype="<u4", count=curve_count, offset=offset + 4)
+    points = np.frombuffer(buffer, dtype="<f4", count=int(counts.sum()) * 3,
+                           offset=offset + 4 + 4 * curve_count).reshape(-1, 3).astype(float)
+    bounds = [0] + np.cumsum(counts).tolist()
+    points = [tuple(point) for point in points.tolist()]
+    return [points[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class GlyphProject:
+    """Проект с множеством глифов: при открытии читается только индекс, глифы декодируются по запросу"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = None
+        self._buffer = None
+        self._index = {}  # имя -> (рамка или None, смещение, длина) в текущем файле
+        self._glyphs = {}  # Декодированные или добавленные глифы
+        self._dirty = set()  # Имена глифов, которые нужно записать при сохранении
+        self._garbage = 0  # Байты старых копий глифов в файле
+        self._file_version = VERSION  # Версия формата открытого файла
+        self._versions = {}  # Имя -> счетчик изменений глифа за время работы с проектом
+
+    @classmethod
+    def open(cls, path):
+        project = cls(path)
+        project._map()
+        return project
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.names())
+
+    def __contains__(self, name):
+        return name in self._index or name in self._glyphs
+
+    def names(self):
+        return list(self._index) + [name for name in self._glyphs if name not in self._index]
+
+    def get(self, name):
+        """Глиф по имени; данные из файла декодируются при первом обращении"""
+        if name not in self._glyphs:
+            self._glyphs[name] = self._decode(name)
+        return self._glyphs[name]
+
+    def _decode(self, name):
+        box, offset, _ = self._index[name]
+        curves = decode_curves(self._buffer, offset)
+        if self._file_version == 1:
+            curves = upgrade_curves(curves)
+        return Glyph(name, curves, box)
+
+    def version(self, name):
+        """Счетчик изменений глифа (для кэшей изображений)"""
+        return self._versions.get(name, 0)
+
+    def put(self, glyph):
+        """Добавляет или заменяет глиф; он будет записан при следующем сохранении, если изменился"""
+        if glyph.name in self:
+            old = self.get(glyph.name)
+            if old.curves == glyph.curves and old.box == glyph.box:
+                return
+        self._glyphs[glyph.name] = glyph
+        self._dirty.add(glyph.name)
+        self._versions[glyph.name] = self.version(glyph.name) + 1
+
+    def remove(self, name):
+        self._versions[name] = self.version(name) + 1
+        self._glyphs.pop(name, None)
+        self._dirty.discard(name)
+        if name in self._index:
+            self._garbage += self._index.pop(name)[2]
+            self._dirty.add(None)  # Индекс нужно переписать
+
+    def save(self, path=None):
+        """Сохраняет проект; в тот же файл дописываются только изменённые глифы"""
+        path = path or self.path
+        if path != self.path or self._buffer is None or not os.path.exists(path) \
+                or self._file_version != VERSION:
+            self._write_full(path)
+        elif self._dirty:
+            data_size = HEADER.size + sum(entry[2] for entry in self._index.values()) + self._garbage
+            if self._garbage + sum(self._index[name][2] for name in self._dirty if name in self._index) \
+                    > COMPACT_RATIO * data_size:
+                self._write_full(path)
+            else:
+                self._append_changes()
+        self._dirty.clear()
+
+    def close(self):
+        if self._buffer is not None:
+            self._buffer.close()
+            self._file.close()
+        self._buffer = None
+        self._file = None
+
+    def _map(self):
+        self._file = open(self.path, "rb")
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, index_offset, index_length = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version not in (1, VERSION):
+            self.close()
+            raise ValueError(f"Неизвестный формат проекта: {self.path}")
+        self._file_version = version
+
+        self._index = {}
+        offset = index_offset
+        for _ in range(count):
+            (name_length,) = struct.unpack_from("<H", self._buffer, offset)
+            name = bytes(self._buffer[offset + 2:offset + 2 + name_length]).decode("utf-8")
+            offset += 2 + name_length
+            has_box, bx0, by0, bx1, by1, data_offset, data_length = INDEX_ENTRY.unpack_from(self._buffer, offset)
+            offset += INDEX_ENTRY.size
+            self._index[name] = ((bx0, by0, bx1, by1) if has_box else None, data_offset, data_length)
+        self._garbage = index_offset - HEADER.size - sum(entry[2] for entry in self._index.values())
+
+    def _encode_index(self, entries):
+        parts = []
+        for name, (box, offset, length) in entries.items():
+            encoded = name.encode("utf-8")
+            parts.append(struct.pack("<H", len(encoded)) + encoded)
+            parts.append(INDEX_ENTRY.pack(box is not None, *(box or (0, 0, 0, 0)), offset, length))
+        return b"".join(parts)
+
+    def _write_full(self, path):
+        """Переписывает файл целиком (новый файл или сжатие после многих сохранений)"""
+        # Нераскрытые глифы декодируются только для записи и не остаются в памяти
+        glyphs = [self._glyphs[name] if name in self._glyphs else self._decode(name) for name in self.names()]
+        entries = {}
+        blobs = []
+        offset = HEADER.size
+        for glyph in glyphs:
+            blob = encode_glyph(glyph)
+            entries[glyph.name] = (glyph.box, offset, len(blob))
+            blobs.append(blob)
+            offset += len(blob)
+        index = self._encode_index(entries)
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(entries), offset, len(index)))
+            f.writelines(blobs)
+            f.write(index)
+        self.close()
+        os.replace(temp_path, path)
+        self.path = path
+        self._map()
+
+    def _append_changes(self):
+        """Дописывает изменённые глифы и новый индекс в конец файла, затем обновляет заголовок"""
+        entries = dict(self._index)
+        self.close()
+        with open(self.path, "r+b") as f:
+            offset = f.seek(0, os.SEEK_END)
+            for name in self.names():
+                if name not in self._dirty:
+                    continue
+                glyph = self._glyphs[name]
+                blob = encode_glyph(glyph)
+                f.write(blob)
+                entries[name] = (glyph.box, offset, len(blob))
+                offset += len(blob)
+            index = self._encode_index(entries)
+            f.write(index)
+            f.flush()
+            os.fsync(f.fileno())
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, len(entries), offset, len(index)))
+        self._map()
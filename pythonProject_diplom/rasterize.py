@@ -0,0 +1,87 @@
+"""Растеризация глифов в изображения без интерфейса (для пакетной отрисовки и экспорта)"""
+import numpy as np
+from PIL import Image, ImageDraw
+
+from sdf import SDF_SPREAD, coverage, distance_field, field_to_texture, stroke_segments, texture_to_field
+from stroke import EXPORT_TOLERANCE, outline_pieces, tessellate_curves
+
+
+def glyph_layout(glyph, size):
+    """Ширина изображения высотой size, масштаб и смещение координат глифа или None для пустого глифа"""
+    frame = glyph.frame()
+    if frame is None:
+        return None
+    x0, y0, x1, y1 = frame
+    frame_width = max(x1 - x0, 1e-6)
+    frame_height = max(y1 - y0, 1e-6)
+    width = max(1, round(size * frame_width / frame_height))
+    scale = size / frame_height
+    return width, scale, (-x0 * scale, -y0 * scale)
+
+
+def glyph_tessellations(glyph, scale):
+    """Тесселяции штрихов глифа с точностью экспорта для масштаба scale"""
+    curves = [curve for curve in glyph.curves if len(curve) >= 2]
+    tolerance = EXPORT_TOLERANCE / scale
+    return tessellate_curves(curves, tolerance, tolerance, 1.0 / scale)
+
+
+def render_glyph(glyph, size, color=(0, 0, 0, 255), background=(255, 255, 255, 0), supersample=4):
+    """Растеризует глиф в изображение высотой size пикселей с сохранением пропорций рамки"""
+    layout = glyph_layout(glyph, size)
+    if layout is None:
+        return Image.new("RGBA", (size, size), background)
+    width, scale, (offset_x, offset_y) = layout
+
+    # Рисуем с запасом по разрешению и уменьшаем - так края получаются сглаженными
+    scale *= supersample
+    offset = (offset_x * supersample, offset_y * supersample)
+    image = Image.new("RGBA", (width * supersample, size * supersample), background)
+    draw = ImageDraw.Draw(image)
+
+    for tessellation in glyph_tessellations(glyph, scale):
+        for polygon in outline_pieces(tessellation.outline, scale, offset):
+            draw.polygon(polygon.ravel().tolist(), fill=color, outline=color)  # Без щелей между частями
+
+    if supersample > 1:
+        image = image.resize((width, size), Image.LANCZOS)
+    return image
+
+
+def fill_coverage(cover, color=(0, 0, 0, 255), background=(255, 255, 255, 0)):
+    """Изображение из покрытия (0..1): цвет штриха поверх фона с прозрачностью по покрытию"""
+    height, width = cover.shape
+    image = Image.new("RGBA", (width, height), background)
+    stroke = Image.new("RGBA", (width, height), color)
+    stroke.putalpha(Image.fromarray(np.round(cover * color[3]).astype(np.uint8), "L"))
+    image.alpha_composite(stroke)
+    return image
+
+
+def glyph_distance_field(glyph, size, spread=SDF_SPREAD):
+    """8-битная текстура поля расстояний глифа высотой size (см. sdf.field_to_texture)"""
+    layout = glyph_layout(glyph, size)
+    if layout is None:
+        return Image.new("L", (size, size), 0)
+    width, scale, offset = layout
+    field = distance_field(stroke_segments(glyph_tessellations(glyph, scale)), width, size, scale, offset, spread)
+    return Image.fromarray(field_to_texture(field, spread), "L")
+
+
+def render_glyph_sdf(glyph, size, color=(0, 0, 0, 255), background=(255, 255, 255, 0)):
+    """Сглаженная растеризация по точному расстоянию до штрихов, без избыточного разрешения"""
+    layout = glyph_layout(glyph, size)
+    if layout is None:
+        return Image.new("RGBA", (size, size), background)
+    width, scale, offset = layout
+    field = distance_field(stroke_segments(glyph_tessellations(glyph, scale)), width, size, scale, offset,
+                           spread=1.0)
+    return fill_coverage(coverage(field), color, background)
+
+
+def render_distance_field(texture, size, spread=SDF_SPREAD, color=(0, 0, 0, 255), background=(255, 255, 255, 0)):
+    """Изображение высотой size из одной сохраненной текстуры поля расстояний (любого размера)"""
+    factor = size / texture.height
+    width = max(1, round(texture.width * factor))
+    field = texture_to_field(texture.resize((width, size), Image.BILINEAR), spread) * factor
+    return fill_coverage(coverage(field), color, background)
@@ -0,0 +1,68 @@
+"""Фоновый поток отрисовки кадров с отбрасыванием устаревших результатов"""
+import threading
+
+
+class RenderWorker:
+    """Строит кадры в отдельном потоке; в главный поток Tk передается готовый кадр, если он новее показанного"""
+
+    def __init__(self, root, render, on_ready, poll_ms=5):
+        self.root = root
+        self.render = render  # render(снимок) -> изображение, вызывается в фоновом потоке
+        self.on_ready = on_ready  # on_ready(изображение), вызывается в главном потоке
+        self.poll_ms = poll_ms
+        self.generation = 0  # Номер последнего заданного кадра
+        self.shown_generation = 0  # Номер последнего выведенного кадра
+        self._condition = threading.Condition()
+        self._pending = None  # (поколение, снимок); новое задание заменяет еще не начатое
+        self._result = None  # (поколение, изображение, исключение)
+        self._busy = False
+        self._poll_job = None
+        self._thread = threading.Thread(target=self._run, name="render-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        """Ставит кадр в очередь; еще не начатое задание заменяется новым"""
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, snapshot)
+            self._condition.notify()
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, snapshot = self._pending
+                self._pending = None
+                self._busy = True
+
+            image, error = None, None
+            try:
+                image = self.render(snapshot)
+            except Exception as e:
+                error = e
+
+            with self._condition:
+                self._busy = False
+                self._result = (generation, image, error)
+
+    def _poll(self):
+        """Забирает готовый кадр в главном потоке; пока есть незавершенные задания, опрос продолжается"""
+        self._poll_job = None
+        with self._condition:
+            result, self._result = self._result, None
+            outstanding = self._busy or self._pending is not None
+
+        if outstanding:
+            self._poll_job = self.root.after(self.poll_ms, self._poll)
+        if result is not None:
+            generation, image, error = result
+            if error is not None:
+                raise error
+            # Кадр, заданный раньше последнего, все равно новее показанного: если отрисовка дольше
+            # промежутка между заданиями, иначе во время перетаскивания не выводился бы ни один кадр
+            if generation > self.shown_generation:
+                self.shown_generation = generation
+                self.on_ready(image)
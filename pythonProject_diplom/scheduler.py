@@ -0,0 +1,77 @@
+"""Планировщик кадров: объединяет запросы перерисовки от событий Tk и рисует не чаще раза за кадр"""
+import time
+
+from profiler import profiler
+
+
+class FrameScheduler:
+    """Помечает виды как требующие перерисовки и отрисовывает их один раз за кадр через root.after"""
+
+    def __init__(self, root, frame_budget_ms=16, settle_delay_ms=150):
+        self.root = root
+        self.frame_budget_ms = frame_budget_ms  # Минимальный интервал между кадрами
+        self.settle_delay_ms = settle_delay_ms  # Пауза без запросов, после которой кадр строится в полном качестве
+        self.interacting = False  # Идет перетаскивание: кадры строятся только в черновом качестве
+        self._views = {}  # имя вида -> функция отрисовки render(quality)
+        self._dirty = set()
+        self._rough = set()  # Виды, последний кадр которых построен в черновом качестве
+        self._frame_job = None
+        self._settle_job = None
+        self._last_frame = 0.0
+        self._events = 0  # Запросов с прошлого кадра (сколько событий объединено в кадр)
+
+    def add_view(self, name, render):
+        self._views[name] = render
+
+    def request(self, *names):
+        """Помечает виды (по умолчанию все) для перерисовки; промежуточные состояния отбрасываются"""
+        self._dirty.update(names or self._views)
+        self._events += 1
+        if self._frame_job is not None:
+            return
+        wait_ms = self.frame_budget_ms - (time.perf_counter() - self._last_frame) * 1000
+        if wait_ms > 0:
+            self._frame_job = self.root.after(int(wait_ms), self._run_frame)
+        else:
+            # after_idle дает Tk сначала обработать накопившиеся события
+            self._frame_job = self.root.after_idle(self._run_frame)
+
+    def begin_interaction(self):
+        self.interacting = True
+        self._cancel_settle()
+
+    def end_interaction(self):
+        """Конец перетаскивания: один кадр в полном качестве для всех черновых видов"""
+        self.interacting = False
+        self._cancel_settle()
+        if self._rough:
+            self._settle_job = self.root.after_idle(self._settle)
+
+    def _run_frame(self):
+        self._frame_job = None
+        self._last_frame = time.perf_counter()
+        dirty, self._dirty = self._dirty, set()
+        events, self._events = self._events, 0
+        for name in self._views:
+            if name in dirty:
+                with profiler.frame(name):
+                    profiler.count("events", events)
+                    self._views[name](False)
+                self._rough.add(name)
+
+        self._cancel_settle()
+        if not self.interacting and self._rough:
+            self._settle_job = self.root.after(self.settle_delay_ms, self._settle)
+
+    def _settle(self):
+        self._settle_job = None
+        rough, self._rough = self._rough, set()
+        for name in self._views:
+            if name in rough:
+                with profiler.frame(name):
+                    self._views[name](True)
+
+    def _cancel_settle(self):
+        if self._settle_job is not None:
+            self.root.after_cancel(self._settle_job)
+            self._settle_job = None
@@ -0,0 +1,101 @@
+"""Поле расстояний со знаком до штрихов переменной ширины и сглаженное покрытие по нему"""
+import numpy as np
+
+TILE_SIZE = 64  # Сторона плитки: все пиксели плитки и близкие к ней отрезки считаются одним массивом
+SEGMENT_CHUNK = 256  # Отрезков за один проход по плитке (ограничивает размер промежуточных массивов)
+SDF_SPREAD = 8.0  # Диапазон расстояний текстуры в пикселях по обе стороны от края
+
+
+def stroke_segments(tessellations):
+    """Отрезки-капсулы всех штрихов массивом N x 6: ax, ay, bx, by, радиус в a, радиус в b"""
+    parts = [
+        np.column_stack((t.xs[:-1], t.ys[:-1], t.xs[1:], t.ys[1:], t.radii[:-1], t.radii[1:]))
+        for t in tessellations
+    ]
+    if not parts:
+        return np.empty((0, 6))
+    return np.concatenate(parts)
+
+
+def capsule_distance(px, py, segments):
+    """Расстояние со знаком от точек до объединения капсул с линейно меняющимся радиусом.
+
+    Для каждой пары точка-отрезок берется точное расстояние до выпуклой оболочки двух кругов
+    (неравной капсулы); если один круг содержит другой, капсула вырождается в больший круг.
+    """
+    ax, ay, bx, by, ra, rb = segments.T
+    px = px[:, None] - ax
+    py = py[:, None] - ay
+    dx = bx - ax
+    dy = by - ay
+    h = dx * dx + dy * dy
+    safe_h = np.where(h > 0, h, 1.0)
+
+    # Координаты точки в системе отрезка: поперек (по модулю) и вдоль, в долях длины
+    qx = np.abs(px * dy - py * dx) / safe_h
+    qy = (px * dx + py * dy) / safe_h
+    b = ra - rb
+    cone = h > b * b
+    cx = np.sqrt(np.where(cone, h - b * b, 0.0))
+    k = cx * qy - b * qx
+    n = qx * qx + qy * qy
+
+    distance = np.where(
+        k < 0, np.sqrt(h * n) - ra,
+        np.where(k > cx, np.sqrt(np.maximum(h * (n + 1 - 2 * qy), 0.0)) - rb, cx * qx + b * qy - ra)
+    )
+    circles = np.minimum(np.hypot(px, py) - ra, np.hypot(px - dx, py - dy) - rb)
+    return np.where(cone, distance, circles).min(axis=1)
+
+
+def distance_field(segments, width, height, scale=1.0, offset=(0, 0), spread=SDF_SPREAD, tile_size=TILE_SIZE):
+    """Поле расстояний в пикселях (height x width, float32), ограниченное [-spread, spread].
+
+    Отрицательные значения - внутри штриха. Отрезки переводятся в пиксели (scale, offset);
+    для каждой плитки берутся только отрезки ближе spread, поэтому пустые плитки не считаются.
+    """
+    field = np.full((height, width), spread, dtype=np.float32)
+    if not len(segments):
+        return field
+
+    pixels = segments * scale + (offset[0], offset[1], offset[0], offset[1], 0, 0)
+    reach = np.maximum(pixels[:, 4], pixels[:, 5]) + spread
+    x0 = np.minimum(pixels[:, 0], pixels[:, 2]) - reach
+    x1 = np.maximum(pixels[:, 0], pixels[:, 2]) + reach
+    y0 = np.minimum(pixels[:, 1], pixels[:, 3]) - reach
+    y1 = np.maximum(pixels[:, 1], pixels[:, 3]) + reach
+
+    for top in range(0, height, tile_size):
+        bottom = min(top + tile_size, height)
+        rows = (y0 <= bottom) & (y1 >= top)
+        if not rows.any():
+            continue
+        for left in range(0, width, tile_size):
+            right = min(left + tile_size, width)
+            near = pixels[rows & (x0 <= right) & (x1 >= left)]
+            if not len(near):
+                continue
+
+            # Центры пикселей плитки
+            ys, xs = np.mgrid[top:bottom, left:right] + 0.5
+            xs, ys = xs.ravel(), ys.ravel()
+            tile = np.full(len(xs), spread)
+            for start in range(0, len(near), SEGMENT_CHUNK):
+                tile = np.minimum(tile, capsule_distance(xs, ys, near[start:start + SEGMENT_CHUNK]))
+            field[top:bottom, left:right] = np.clip(tile, -spread, spread).reshape(bottom - top, right - left)
+    return field
+
+
+def coverage(field):
+    """Сглаженное покрытие пикселей (0..1) по полю расстояний в пикселях"""
+    return np.clip(0.5 - field, 0.0, 1.0)
+
+
+def field_to_texture(field, spread=SDF_SPREAD):
+    """Поле расстояний в 8-битную текстуру: 128 - край штриха, больше - внутри"""
+    return np.clip(np.round(127.5 - field * (127.5 / spread)), 0, 255).astype(np.uint8)
+
+
+def texture_to_field(texture, spread=SDF_SPREAD):
+    """Поле расстояний в пикселях текстуры из 8-битной текстуры"""
+    return (127.5 - np.asarray(texture, dtype=np.float32)) * (spread / 127.5)
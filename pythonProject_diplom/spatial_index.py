@@ -0,0 +1,75 @@
+"""Пространственный индекс контрольных точек для быстрого поиска точки под курсором"""
+import math
+
+
+class PointIndex:
+    """Равномерная сетка над контрольными точками в координатах изображения"""
+
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self._cells = {}  # (столбец, строка) -> множество ключей
+        self._points = {}  # (номер кривой, номер точки) -> (x, y, радиус)
+        self._max_radius = 0
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, key, x, y, radius):
+        if key in self._points:
+            self.remove(key)
+        self._points[key] = (x, y, radius)
+        self._cells.setdefault(self._cell(x, y), set()).add(key)
+        self._max_radius = max(self._max_radius, radius)
+
+    def update(self, key, x, y, radius):
+        """Перемещает точку или меняет её радиус"""
+        self.insert(key, x, y, radius)
+
+    def remove(self, key):
+        x, y, _ = self._points.pop(key)
+        cell = self._cell(x, y)
+        self._cells[cell].discard(key)
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._points.clear()
+        self._max_radius = 0
+
+    def rebuild(self, curves):
+        """Заново строит индекс по кривым (CurveStore или списки [(x, y, radius), ...])"""
+        self.clear()
+        for curve_idx, curve in enumerate(curves):
+            for point_idx, (x, y, radius) in enumerate(curve):
+                self.insert((curve_idx, point_idx), x, y, radius)
+
+    def _keys_in_cells(self, x0, y0, x1, y1):
+        col0, row0 = self._cell(x0, y0)
+        col1, row1 = self._cell(x1, y1)
+        for col in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                yield from self._cells.get((col, row), ())
+
+    def nearest(self, x, y):
+        """Ближайшая точка, в круг которой попадает (x, y), или None"""
+        reach = self._max_radius
+        best_key, best_distance = None, None
+        for key in self._keys_in_cells(x - reach, y - reach, x + reach, y + reach):
+            px, py, radius = self._points[key]
+            distance = math.hypot(x - px, y - py)
+            if distance <= radius and (best_key is None or (distance, key) < (best_distance, best_key)):
+                best_key, best_distance = key, distance
+        return best_key
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Ключи всех точек внутри прямоугольника (в порядке кривых и точек)"""
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        return sorted(
+            key for key in self._keys_in_cells(x0, y0, x1, y1)
+            if x0 <= self._points[key][0] <= x1 and y0 <= self._points[key][1] <= y1
+        )
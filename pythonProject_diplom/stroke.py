@@ -0,0 +1,404 @@
+"""Вычисление и тесселяция штрихов переменной ширины: сплайнов из кубических сегментов Безье"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+CAP_STEPS = 8  # Количество промежуточных точек в каждом круглом окончании
+MAX_DEPTH = 12  # Предельная глубина адаптивного разбиения (до 4096 участков на кривую)
+
+# Допуски адаптивной тесселяции в пикселях экрана (отклонение от хорды и от линейного радиуса)
+DISPLAY_TOLERANCE = 0.25
+EXPORT_TOLERANCE = 0.1
+
+
+def subdivide_curves(curves, tolerance, radius_tolerance, max_depth=MAX_DEPTH):
+    """Адаптивное разбиение де Кастельжо: участок делится пополам, пока он не станет плоским.
+
+    Участок плоский, если его контрольные точки отстоят от хорды не дальше tolerance,
+    а радиусы - от линейной интерполяции не дальше radius_tolerance (в единицах изображения).
+    Все участки одного уровня всех кривых одной степени делятся одной операцией NumPy.
+    Возвращает для каждой кривой x, y и радиусы концов плоских участков.
+    """
+    groups = {}
+    for idx, curve in enumerate(curves):
+        groups.setdefault(len(curve), []).append(idx)
+
+    results = [None] * len(curves)
+    for indices in groups.values():
+        control = np.asarray([curves[idx] for idx in indices], dtype=float)
+        owner = np.arange(len(indices))  # Номер кривой в группе для каждого участка
+        starts = np.zeros(len(indices))  # Параметр t начала участка
+        width = 1.0
+        leaves = []
+
+        for depth in range(max_depth + 1):
+            flat = _is_flat(control, tolerance, radius_tolerance) | (depth == max_depth)
+            leaves.append((control[flat], owner[flat], starts[flat]))
+            if flat.all():
+                break
+            control, owner, starts = control[~flat], owner[~flat], starts[~flat]
+            width /= 2
+            left, right = _split_half(control)
+            control = np.concatenate((left, right))
+            owner = np.concatenate((owner, owner))
+            starts = np.concatenate((starts, starts + width))
+
+        control = np.concatenate([leaf[0] for leaf in leaves])
+        owner = np.concatenate([leaf[1] for leaf in leaves])
+        starts = np.concatenate([leaf[2] for leaf in leaves])
+        order = np.lexsort((starts, owner))
+        control, owner = control[order], owner[order]
+        bounds = np.searchsorted(owner, np.arange(len(indices) + 1))
+
+        for group_idx, idx in enumerate(indices):
+            pieces = control[bounds[group_idx]:bounds[group_idx + 1]]
+            points = np.concatenate((pieces[:, 0], pieces[-1:, -1]))
+            results[idx] = (points[:, 0], points[:, 1], points[:, 2])
+    return results
+
+
+def spline_segments(curve):
+    """Кубические сегменты Безье сплайна Катмулла-Рома через точки кривой (сегменты x 4 x 3).
+
+    Касательная в точке берется по двум соседям, поэтому соседние сегменты стыкуются
+    с непрерывной первой производной (C1), а радиус меняется вдоль штриха так же плавно.
+    Каждый сегмент зависит только от четырех ближайших точек, поэтому перемещение точки
+    меняет до четырех сегментов (у замкнутой кривой точка стыка - до шести). У замкнутой кривой
+    (последняя точка совпадает с первой) касательная на стыке берется по соседям с обеих сторон.
+    """
+    points = np.asarray(curve, dtype=float)
+    if len(points) > 3 and np.array_equal(points[0], points[-1]):
+        padded = np.concatenate((points[-2:-1], points, points[1:2]))
+    else:
+        padded = np.concatenate((points[:1], points, points[-1:]))
+    tangents = (padded[2:] - padded[:-2]) / 6
+    return np.stack((points[:-1], points[:-1] + tangents[:-1], points[1:] - tangents[1:], points[1:]), axis=1)
+
+
+def curve_pieces(curve):
+    """Части кривой для вычисления: сегменты сплайна при любом числе точек.
+
+    Новая точка меняет только последние сегменты, а не смысл всей кривой.
+    """
+    return list(spline_segments(curve))
+
+
+def bezier_to_spline(curve, steps=6):
+    """Точки сплайна, повторяющего одну кривую Безье (штрихи файлов старого формата)"""
+    control = np.asarray(curve, dtype=float)
+    degree = len(control) - 1
+    t = np.linspace(0, 1, steps * degree + 1)[:, None]
+    basis = np.hstack([math.comb(degree, k) * t ** k * (1 - t) ** (degree - k) for k in range(degree + 1)])
+    return [tuple(point) for point in (basis @ control).tolist()]
+
+
+def join_pieces(pieces):
+    """Склеивает x, y и радиусы последовательных частей кривой, не повторяя общие концы"""
+    if len(pieces) == 1:
+        return pieces[0]
+    return tuple(np.concatenate([component[0][:1]] + [values[1:] for values in component])
+                 for component in zip(*pieces))
+
+
+def _is_flat(control, tolerance, radius_tolerance):
+    """Признак плоскости для каждого участка (участки x точки x 3)"""
+    start = control[:, :1, :2]
+    chord = control[:, -1:, :2] - start
+    inner = control[:, 1:-1, :2] - start
+    length2 = np.sum(chord ** 2, axis=-1)
+    t = np.clip(np.sum(inner * chord, axis=-1) / np.where(length2 > 0, length2, 1.0), 0.0, 1.0)
+    distance = np.linalg.norm(inner - t[..., None] * chord, axis=-1)
+
+    # Радиус Безье линеен по t, если контрольные радиусы линейны по номеру точки
+    steps = np.linspace(0.0, 1.0, control.shape[1])[1:-1]
+    linear = control[:, :1, 2] + (control[:, -1:, 2] - control[:, :1, 2]) * steps
+    radius_error = np.abs(control[:, 1:-1, 2] - linear)
+
+    return ((distance.max(axis=1, initial=0.0) <= tolerance)
+            & (radius_error.max(axis=1, initial=0.0) <= radius_tolerance))
+
+
+def _split_half(control):
+    """Делит участки в точке t = 0.5 по алгоритму де Кастельжо"""
+    left = [control[:, 0]]
+    right = [control[:, -1]]
+    points = control
+    for _ in range(control.shape[1] - 1):
+        points = (points[:, :-1] + points[:, 1:]) / 2
+        left.append(points[:, 0])
+        right.append(points[:, -1])
+    return np.stack(left, axis=1), np.stack(right[::-1], axis=1)
+
+
+def stamp_positions(xs, ys, radii, spacing=1.0):
+    """Раскладывает отпечатки круга между соседними точками кривой (по одному на spacing длины)"""
+    dx = np.diff(xs)
+    dy = np.diff(ys)
+    dr = np.diff(radii)
+    counts = np.maximum(3, (np.hypot(dx, dy) / spacing).astype(int))
+
+    # Номер сегмента и номер отпечатка внутри сегмента для каждого отпечатка
+    segment = np.repeat(np.arange(len(counts)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    t = (np.arange(len(segment)) - first) / (counts[segment] - 1)
+
+    return (xs[segment] + dx[segment] * t,
+            ys[segment] + dy[segment] * t,
+            radii[segment] + dr[segment] * t)
+
+
+# Контур штриха: точка контура = центр + направление * радиус; pieces - номера точек контура
+# для простых (без самопересечений) многоугольников, объединение которых и есть штрих
+Outline = namedtuple("Outline", ["centers", "directions", "radii", "pieces"])
+
+
+def envelope_outline(xs, ys, radii, cap_steps=CAP_STEPS, tolerance=1.0):
+    """Контур штриха переменной ширины: левая огибающая, круглый конец, правая огибающая, круглое начало.
+
+    tolerance - допустимый срез внешней стороны изгиба хордой огибающей (в единицах изображения).
+    """
+    dx = np.gradient(xs)
+    dy = np.gradient(ys)
+    dr = np.gradient(radii)
+    length = np.hypot(dx, dy)
+
+    angles = np.linspace(0, 2 * math.pi, 2 * cap_steps + 2, endpoint=False)
+    circle = np.column_stack((np.cos(angles), np.sin(angles)))
+    if not length.any():
+        # Вырожденная кривая (все точки совпадают) - рисуем круг
+        centers = np.tile((xs[0], ys[0]), (len(angles), 1))
+        return Outline(centers, circle, np.full(len(angles), radii.max()), (np.arange(len(angles)),))
+
+    length = np.where(length > 0, length, 1.0)
+    tx, ty = dx / length, dy / length
+
+    # Огибающая семейства кругов смещена по нормали с поправкой на скорость изменения радиуса
+    slope = dr / length
+    # Круг не покрыт огибающей, если радиус растет быстрее, чем движется центр, или на изломе
+    # (в том числе в точке возврата), где хорда огибающей срезает внешнюю сторону больше tolerance
+    segments = np.column_stack((np.diff(xs), np.diff(ys)))
+    segment_length = np.hypot(segments[:, 0], segments[:, 1])
+    turn_cos = (np.sum(segments[:-1] * segments[1:], axis=1)
+                / np.maximum(segment_length[:-1] * segment_length[1:], 1e-12))
+    half_cos = np.sqrt(np.clip((1 + turn_cos) / 2, 0.0, 1.0))
+    sharp = (radii[1:-1] * (1 - half_cos) > tolerance) & (segment_length[:-1] > 0) & (segment_length[1:] > 0)
+    joints = np.flatnonzero((np.abs(slope) >= 1) | np.concatenate(([False], sharp, [False])))
+    slope = np.clip(slope, -1.0, 1.0)
+    cos = np.sqrt(1 - slope ** 2)
+    left = np.column_stack((-ty * cos - tx * slope, tx * cos - ty * slope))
+    right = np.column_stack((ty * cos - tx * slope, -tx * cos - ty * slope))
+
+    end_cap = _cap_directions(left[-1], right[-1], cap_steps)
+    start_cap = _cap_directions(right[0], left[0], cap_steps)
+
+    centers = np.column_stack((xs, ys))
+    directions = np.concatenate((left, end_cap, right[::-1], start_cap))
+    outline_centers = np.concatenate((
+        centers,
+        np.tile(centers[-1], (cap_steps, 1)),
+        centers[::-1],
+        np.tile(centers[0], (cap_steps, 1)),
+    ))
+    outline_radii = np.concatenate((
+        radii, np.full(cap_steps, radii[-1]), radii[::-1], np.full(cap_steps, radii[0]),
+    ))
+    pieces = _envelope_pieces(centers, centers + left * radii[:, None], centers + right * radii[:, None],
+                              cap_steps, tolerance)
+    if len(joints):
+        # Круги в таких точках добавляются после контура отдельными частями
+        first = len(directions)
+        directions = np.concatenate((directions, np.tile(circle, (len(joints), 1))))
+        outline_centers = np.concatenate((outline_centers, np.repeat(centers[joints], len(circle), axis=0)))
+        outline_radii = np.concatenate((outline_radii, np.repeat(radii[joints], len(circle))))
+        pieces += tuple(first + np.arange(len(joints) * len(circle)).reshape(len(joints), len(circle)))
+    return Outline(outline_centers, directions, outline_radii, pieces)
+
+
+def _envelope_pieces(centers, left, right, cap_steps, tolerance):
+    """Разбивает контур на части, которые PIL и Tk заливают без дыр.
+
+    Многоугольники заливаются по правилу чет-нечет, поэтому контур петли или замкнутого
+    штриха теряет область самопересечения. Контур режется на участки, вдоль которых центр
+    и обе огибающие монотонны в направлении первого сегмента участка (такой участок не
+    пересекает сам себя); соседние участки делят общее ребро, концы рисуются отдельно.
+    Сегмент, на котором огибающая складывается, рисуется выпуклой оболочкой своего четырехугольника.
+    Ребра огибающих короче tolerance не учитываются: их петля меньше пикселя.
+    Если весь штрих - один такой участок, остается единственный многоугольник контура.
+    """
+    count = len(centers)
+    segments = np.diff(centers, axis=0)
+    moving = segments.any(axis=1)  # Совпадающие точки не задают направления
+    heading = np.arctan2(segments[:, 1], segments[:, 0])
+    last_moving = np.maximum.accumulate(np.where(moving, np.arange(count - 1), -1))
+    last_moving[last_moving < 0] = np.argmax(moving)
+    heading = np.unwrap(heading[last_moving])
+
+    # Направления огибающих - отклонением от своего сегмента; отклонение больше прямого угла -
+    # складка на внутренней стороне крутого изгиба
+    low, high = heading.copy(), heading.copy()
+    folds = np.zeros(count - 1, dtype=bool)
+    for side in (left, right):
+        edges = np.diff(side, axis=0)
+        deviation = (np.arctan2(edges[:, 1], edges[:, 0]) - heading + math.pi) % (2 * math.pi) - math.pi
+        deviation[~moving | (np.hypot(edges[:, 0], edges[:, 1]) < tolerance)] = 0.0
+        folds |= np.abs(deviation) >= math.pi / 2
+        low = np.minimum(low, heading + deviation)
+        high = np.maximum(high, heading + deviation)
+
+    runs = []
+    fold_segments = []
+    start = 0
+    while start < count - 1:
+        if folds[start]:
+            fold_segments.append(start)
+            start += 1
+            continue
+        reference = heading[start]
+        breaks = folds[start:] | (high[start:] - reference >= math.pi / 2) | (reference - low[start:] >= math.pi / 2)
+        end = start + int(np.argmax(breaks)) if breaks.any() else count - 1
+        runs.append((start, end))
+        start = end
+
+    if not fold_segments and runs == [(0, count - 1)]:
+        return (np.arange(2 * count + 2 * cap_steps),)
+    # Номера точек контура: левая огибающая 0..count-1, затем конец, правая огибающая в обратном порядке, начало
+    right_end = 2 * count + cap_steps - 1  # Номер правой точки начала (right[0])
+    pieces = [np.concatenate((np.arange(first, last + 1), np.arange(right_end - last, right_end - first + 1)))
+              for first, last in runs]
+    if fold_segments:
+        # Четырехугольник складки перекручен; его выпуклую оболочку дают четыре треугольника на его вершинах
+        folded = np.array(fold_segments)[:, None]
+        corners = np.hstack((folded, folded + 1, right_end - folded - 1, right_end - folded))
+        triangles = corners[:, [[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]]].reshape(-1, 3)
+        pieces.extend(triangles)
+    pieces.append(np.arange(count - 1, count + cap_steps + 1))
+    pieces.append(np.concatenate((np.arange(right_end, 2 * count + 2 * cap_steps), [0])))
+    return tuple(pieces)
+
+
+def _cap_directions(start, end, cap_steps):
+    """Направления на дуге по часовой стрелке от направления start до направления end"""
+    first = math.atan2(start[1], start[0])
+    sweep = (first - math.atan2(end[1], end[0])) % (2 * math.pi)
+    angles = first - np.linspace(0, sweep, cap_steps + 2)[1:-1]
+    return np.column_stack((np.cos(angles), np.sin(angles)))
+
+
+def outline_polygon(outline, scale, offset):
+    """Вершины многоугольника контура в координатах холста (N x 2)"""
+    radii = np.maximum(1, outline.radii * scale)  # Не меньше 1 пикселя
+    return outline.centers * scale + offset + outline.directions * radii[:, None]
+
+
+def outline_pieces(outline, scale, offset):
+    """Многоугольники частей контура в координатах холста; заливка каждого дает штрих без дыр"""
+    polygon = outline_polygon(outline, scale, offset)
+    return [polygon[piece] for piece in outline.pieces]
+
+
+class Tessellation:
+    """Тесселяция одной кривой; сравнивается по идентичности, поэтому годится в ключи кэшей"""
+
+    __slots__ = ("xs", "ys", "radii", "stamps", "outline")
+
+    def __init__(self, xs, ys, radii, stamps, outline):
+        self.xs = xs
+        self.ys = ys
+        self.radii = radii
+        self.stamps = stamps  # Отпечатки кругов (N x 3: x, y, радиус)
+        self.outline = outline  # Контур штриха (Outline)
+
+
+def make_tessellation(xs, ys, radii, spacing=1.0):
+    """Отпечатки и контур штриха по точкам разбиения"""
+    radii = np.maximum(radii, 0)  # Сплайн радиуса может немного уходить ниже нуля у резких перепадов
+    return Tessellation(xs, ys, radii, np.column_stack(stamp_positions(xs, ys, radii, spacing)),
+                        envelope_outline(xs, ys, radii, tolerance=spacing))
+
+
+def tessellate_curves(curves, tolerance, radius_tolerance, spacing=1.0):
+    """Адаптивная тесселяция кривых; допуски и шаг отпечатков - в единицах изображения.
+
+    Сегменты сплайнов всех кривых разбиваются одним пакетом.
+    """
+    pieces = [curve_pieces(curve) for curve in curves]
+    subdivided = iter(subdivide_curves([piece for parts in pieces for piece in parts],
+                                       tolerance, radius_tolerance))
+    return [make_tessellation(*join_pieces([next(subdivided) for _ in parts]), spacing) for parts in pieces]
+
+
+class TessellationCache:
+    """Кэш тесселяции кривых хранилища CurveStore: кривая пересчитывается, только если её точки менялись.
+
+    Допуск задается в пикселях экрана, поэтому тесселяция зависит от масштаба; масштаб
+    округляется вверх до степени двойки, и для каждой кривой хранится по записи на уровень.
+    Дополнительно запоминается разбиение каждого сегмента сплайна, и после правки точки
+    заново разбиваются только сегменты, которые от неё зависят (до четырех).
+
+    Отпечатки и контур после правки строятся заново по всей кривой: огибающая в точке
+    зависит от соседей, а части контура, изломы и концы - от всего штриха. Это линейная
+    по числу точек работа на каждую правку (на штрихе из 300 точек - около 3 мс из 6).
+    """
+
+    def __init__(self, pixel_tolerance=DISPLAY_TOLERANCE):
+        self.pixel_tolerance = pixel_tolerance
+        # ключ кривой -> (счетчик изменений, {уровень: тесселяция}, {уровень: {байты сегмента: разбиение}})
+        self._entries = {}
+
+    @staticmethod
+    def zoom_scale(zoom):
+        """Масштаб, округленный вверх до степени двойки"""
+        return 2.0 ** math.ceil(math.log2(zoom))
+
+    def get(self, store, idx, zoom=1.0):
+        """Возвращает тесселяцию кривой idx, пересчитывая её при изменении"""
+        return self.get_many(store, [idx], zoom)[0]
+
+    def get_many(self, store, indices, zoom=1.0):
+        """Возвращает тесселяции кривых для масштаба zoom; изменённые кривые пересчитываются одним пакетом"""
+        scale = self.zoom_scale(zoom)
+        results = [None] * len(indices)
+        dirty = []
+        for position, idx in enumerate(indices):
+            key, revision = store.version(idx)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != revision:
+                entry = (revision, {}, entry[2] if entry is not None else {})
+                self._entries[key] = entry
+            results[position] = entry[1].get(scale)
+            if results[position] is None:
+                dirty.append(position)
+
+        if dirty:
+            tolerance = self.pixel_tolerance / scale
+            # Представления кривых из хранилища идут в вычисление без преобразования;
+            # разбиваются одним пакетом только части, которых нет в кэше сегментов
+            parts, missing = [], []
+            for position in dirty:
+                known = self._entries[store.version(indices[position])[0]][2].get(scale, {})
+                pieces = []
+                for piece in curve_pieces(store[indices[position]]):
+                    piece_key = np.asarray(piece).tobytes()
+                    if piece_key not in known:
+                        missing.append(piece)
+                    pieces.append((piece_key, known.get(piece_key)))
+                parts.append(pieces)
+
+            subdivided = iter(subdivide_curves(missing, tolerance, tolerance))
+            for position, pieces in zip(dirty, parts):
+                entry = self._entries[store.version(indices[position])[0]]
+                pieces = [(piece_key, values or next(subdivided)) for piece_key, values in pieces]
+                entry[2][scale] = dict(pieces)  # Устаревшие сегменты не хранятся
+                entry[1][scale] = make_tessellation(*join_pieces([values for _, values in pieces]), 1.0 / scale)
+                results[position] = entry[1][scale]
+        return results
+
+    def prune(self, store):
+        """Удаляет записи кривых, которых больше нет в хранилище"""
+        alive = set(store.keys())
+        for key in [key for key in self._entries if key not in alive]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
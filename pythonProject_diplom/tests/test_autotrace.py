@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from autotrace import trace_image
+from bitmap import crossing_numbers, skeletonize, thin_corners
+
+
+def line_image(angle, width, length=180):
+    image = Image.new("L", (300, 300), 255)
+    end = (50 + length * math.cos(math.radians(angle)), 50 + length * math.sin(math.radians(angle)))
+    ImageDraw.Draw(image).line([(50, 50), end], fill=0, width=width)
+    return image
+
+
+def ring_image(radius, width):
+    image = Image.new("L", (100, 100), 255)
+    ImageDraw.Draw(image).ellipse([50 - radius, 50 - radius, 50 + radius, 50 + radius], outline=0, width=width)
+    return image
+
+
+@pytest.mark.parametrize("angle", [0, 10, 37, 45, 60, 80])
+@pytest.mark.parametrize("width", [3, 6, 10])
+def test_straight_line_is_one_curve(angle, width):
+    curves = trace_image(line_image(angle, width), jobs=1)
+    assert len(curves) == 1
+    # Опорные точки лежат на самой линии (с точностью до толщины штриха)
+    x, y = np.array(curves[0])[:, :2].T - 50
+    direction = math.radians(angle)
+    assert np.abs(y * math.cos(direction) - x * math.sin(direction)).max() <= width / 2 + 1
+
+
+def swell_image(width):
+    # Прямой штрих, тонкий на концах и толстый посередине
+    image = Image.new("L", (300, 300), 255)
+    ImageDraw.Draw(image).polygon([(40, 150), (150, 150 - width / 2), (260, 150), (150, 150 + width / 2)], fill=0)
+    return image
+
+
+@pytest.mark.parametrize("width", [12, 20, 30])
+def test_tapered_stroke_keeps_radius(width):
+    curves = trace_image(swell_image(width), jobs=1)
+    assert len(curves) == 1
+    # Утолщение посередине не теряется при упрощении прямой средней линии
+    radii = np.array(curves[0])[:, 2]
+    assert len(curves[0]) > 2
+    assert radii.max() >= width / 2 - 2
+    assert radii[0] < width / 4 and radii[-1] < width / 4
+
+
+@pytest.mark.parametrize("radius, width", [(14, 2), (14, 4), (14, 6), (20, 10), (40, 6)])
+def test_ring_is_one_closed_curve(radius, width):
+    curves = trace_image(ring_image(radius, width), jobs=1)
+    assert len(curves) == 1
+    assert curves[0][0] == curves[0][-1]
+
+
+def test_thin_corners_leaves_only_junctions_with_three_neighbors():
+    # Лесенки наклонной линии не должны давать пикселей с тремя соседями
+    mask = np.asarray(line_image(37, 6)) < 128
+    skeleton = thin_corners(skeletonize(mask))
+    count, _ = crossing_numbers(skeleton)
+    assert count[skeleton].max() == 2
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from curve_store import CurveStore
+
+
+def make_curves():
+    return [[(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)],
+            [(7.0, 8.0, 1.0)],
+            [],
+            [(9.0, 9.0, 2.0), (10.0, 11.0, 2.5), (12.0, 13.0, 3.5)]]
+
+
+def assert_consistent(store, expected):
+    # Кривые, номера кривых точек и начала кривых согласованы со списками
+    assert store.to_lists() == expected
+    assert len(store) == len(expected)
+    ids = [idx for idx, curve in enumerate(expected) for _ in curve]
+    assert store.curve_ids.tolist() == ids
+    assert store._starts == [0] + np.cumsum([len(curve) for curve in expected]).tolist()
+    assert store.frozen().tolist() == [list(point) for curve in expected for point in curve]
+    assert len(set(store.keys())) == len(expected)
+
+
+def mutations():
+    def insert_curve(store, expected):
+        store.insert_curve(1, [(20.0, 21.0, 22.0), (23.0, 24.0, 25.0)])
+        expected.insert(1, [(20.0, 21.0, 22.0), (23.0, 24.0, 25.0)])
+
+    def insert_empty_curve(store, expected):
+        store.insert_curve(0)
+        expected.insert(0, [])
+
+    def remove_curve(store, expected):
+        assert store.remove_curve(1) == expected.pop(1)
+
+    def remove_last_curve(store, expected):
+        assert store.remove_curve(len(store) - 1) == expected.pop()
+
+    def append_point(store, expected):
+        store.append_point(1, 30.0, 31.0, 32.0)
+        expected[1].append((30.0, 31.0, 32.0))
+
+    def append_to_empty_curve(store, expected):
+        store.append_point(2, 33.0, 34.0, 35.0)
+        expected[2].append((33.0, 34.0, 35.0))
+
+    def pop_point(store, expected):
+        assert store.pop_point(0) == expected[0].pop()
+
+    def set_point(store, expected):
+        store.set_point(3, 1, 40.0, 41.0, 42.0)
+        expected[3][1] = (40.0, 41.0, 42.0)
+
+    def clear(store, expected):
+        store.clear()
+        expected.clear()
+
+    return [insert_curve, insert_empty_curve, remove_curve, remove_last_curve,
+            append_point, append_to_empty_curve, pop_point, set_point, clear]
+
+
+@pytest.mark.parametrize("mutate", mutations(), ids=lambda mutate: mutate.__name__)
+def test_mutation_keeps_store_consistent(mutate):
+    expected = make_curves()
+    store = CurveStore.from_curves(expected)
+    revision = store.revision
+    frozen = store.frozen()
+    mutate(store, expected)
+    assert store.revision > revision
+    assert store.frozen() is not frozen
+    assert_consistent(store, expected)
+
+
+def test_keys_follow_curves():
+    store = CurveStore.from_curves(make_curves())
+    keys = store.keys()
+    store.insert_curve(1, [(0.0, 0.0, 1.0)])
+    assert store.keys()[:1] + store.keys()[2:] == keys
+    assert store.keys()[1] not in keys
+    store.remove_curve(0)
+    assert store.keys()[1:] == keys[1:]
+
+
+def test_point_edits_change_only_their_curve_version():
+    store = CurveStore.from_curves(make_curves())
+    versions = [store.version(idx) for idx in range(len(store))]
+    store.set_point(0, 0, 0.0, 0.0, 1.0)
+    store.append_point(3, 1.0, 1.0, 1.0)
+    store.pop_point(3)
+    assert store.version(0) != versions[0] and store.version(3) != versions[3]
+    assert store.version(0)[0] == versions[0][0]
+    assert [store.version(idx) for idx in (1, 2)] == versions[1:3]
+
+
+def test_growth_keeps_points():
+    expected = [[(float(i), float(j), 1.0) for j in range(50)] for i in range(5)]
+    store = CurveStore(capacity=1)
+    for curve in expected:
+        idx = store.add_curve()
+        for point in curve:
+            store.append_point(idx, *point)
+    assert_consistent(store, expected)
@@ -0,0 +1,34 @@
+import numpy as np
+from PIL import Image
+
+from curve_store import CurveStore
+from frame_renderer import FrameRenderer, FrameSnapshot
+from image_view import ImagePyramid
+
+CANVAS_SIZE = (200, 200)
+COLOR = (0, 0, 255, 255)
+
+
+def render_frame(renderer, pyramid, store):
+    snapshot = FrameSnapshot(
+        canvas_size=CANVAS_SIZE, zoom=1.0, offset=(0, 0), quality=False, stroke_mode="outline",
+        pyramid=pyramid, committed=(), active=(), handles=store.frozen(),
+        handles_key=(store.serial, store.revision), overlay=None,
+    )
+    return np.asarray(renderer.render(snapshot).getchannel("B"))
+
+
+def test_handles_layer_follows_store():
+    # Два хранилища с одинаковым номером изменения (например, после переключения глифа)
+    first = CurveStore.from_curves([[(50, 50, 5)]])
+    second = CurveStore.from_curves([[(150, 150, 5)]])
+    assert first.revision == second.revision
+
+    renderer = FrameRenderer(COLOR, COLOR, COLOR)
+    pyramid = ImagePyramid(Image.new("RGB", CANVAS_SIZE, "white"))
+    render_frame(renderer, pyramid, first)
+    frame = render_frame(renderer, pyramid, second)
+    blank = render_frame(FrameRenderer(COLOR, COLOR, COLOR), pyramid, CurveStore())
+    changed = np.argwhere(frame != blank)
+    assert len(changed)
+    assert changed.min() > 100  # Нарисованы точки второго хранилища, а не закэшированные точки первого
@@ -0,0 +1,73 @@
+from PIL import Image
+
+from glyph import Glyph
+from glyph_cache import GlyphBitmapCache
+from project_file import GlyphProject
+
+SIZE = 10  # Изображение 10 x 10 в режиме L занимает 100 байт
+
+
+def renderer(calls, value=0):
+    def render():
+        calls.append(value)
+        return Image.new("L", (SIZE, SIZE), value)
+    return render
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = GlyphBitmapCache(budget_bytes=3 * SIZE * SIZE)
+    calls = []
+    for name in "abc":
+        cache.get(name, 0, SIZE, renderer(calls))
+    cache.get("a", 0, SIZE, renderer(calls))  # "a" становится самым новым
+    cache.get("d", 0, SIZE, renderer(calls))
+    assert len(cache) == 3 and cache.size_bytes == 3 * SIZE * SIZE
+    assert [key[0] for key in cache._entries] == ["c", "a", "d"]
+
+    calls.clear()
+    for name in "acd":
+        cache.get(name, 0, SIZE, renderer(calls))
+    assert calls == []
+    cache.get("b", 0, SIZE, renderer(calls))
+    assert calls == [0]
+    assert [key[0] for key in cache._entries] == ["c", "d", "b"]
+
+
+def test_entry_larger_than_budget_stays_alone():
+    cache = GlyphBitmapCache(budget_bytes=SIZE * SIZE)
+    calls = []
+    cache.get("a", 0, SIZE, renderer(calls))
+    cache.get("b", 0, 2 * SIZE, lambda: Image.new("L", (2 * SIZE, 2 * SIZE)))
+    assert [key[0] for key in cache._entries] == ["b"]
+    assert cache.size_bytes == 4 * SIZE * SIZE
+
+
+def test_put_makes_old_bitmap_stale(tmp_path):
+    project = GlyphProject(str(tmp_path / "font.fgp"))
+    project.put(Glyph("a", [[(1.0, 1.0, 1.0), (5.0, 5.0, 1.0)]], (0, 0, 8, 8)))
+    cache = GlyphBitmapCache()
+    calls = []
+    first = cache.get("a", project.version("a"), SIZE, renderer(calls, 1))
+    assert cache.get("a", project.version("a"), SIZE, renderer(calls, 2)) is first
+
+    # Тот же глиф без изменений не меняет версию, измененный - меняет
+    project.put(Glyph("a", [[(1.0, 1.0, 1.0), (5.0, 5.0, 1.0)]], (0, 0, 8, 8)))
+    assert cache.get("a", project.version("a"), SIZE, renderer(calls, 3)) is first
+    project.put(Glyph("a", [[(1.0, 1.0, 1.0), (6.0, 5.0, 1.0)]], (0, 0, 8, 8)))
+    second = cache.get("a", project.version("a"), SIZE, renderer(calls, 4))
+    assert second is not first and second.getpixel((0, 0)) == 4
+    assert calls == [1, 4]
+    # Изображения старой версии удалены сразу, а не вытесняются по бюджету
+    assert len(cache) == 1 and cache.size_bytes == SIZE * SIZE
+    project.close()
+
+
+def test_other_glyphs_survive_invalidation():
+    cache = GlyphBitmapCache()
+    calls = []
+    b = cache.get("b", 0, SIZE, renderer(calls))
+    cache.get("a", 0, SIZE, renderer(calls))
+    cache.get("a", 1, SIZE, renderer(calls))
+    assert cache.get("b", 0, SIZE, renderer(calls)) is b
+    cache.invalidate()
+    assert len(cache) == 0 and cache.size_bytes == 0
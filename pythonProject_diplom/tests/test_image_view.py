@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import image_view
+from image_view import ScanTiles, open_scan, tiff_strips
+
+
+def noise_image(mode, size=(301, 97)):
+    rng = np.random.default_rng(7)
+    image = Image.fromarray(rng.integers(0, 255, size[::-1] + (3,), dtype=np.uint8), "RGB")
+    return image.convert(mode)
+
+
+@pytest.mark.parametrize("mode", ["RGB", "L", "1"])
+def test_tiff_strips_match_full_decode(tmp_path, mode):
+    path = str(tmp_path / "scan.tif")
+    image = noise_image(mode)
+    image.save(path)
+    strips = tiff_strips(path, rows=10)
+    assert strips is not None
+    decoded = [np.asarray(strip) for _, strip in strips]
+    assert all(len(strip) <= 10 for strip in decoded)
+    assert np.array_equal(np.concatenate(decoded), np.asarray(image))
+
+
+def test_compressed_tiff_falls_back_to_full_decode(tmp_path):
+    path = str(tmp_path / "scan.tif")
+    image = noise_image("RGB")
+    image.save(path, compression="tiff_lzw")
+    assert tiff_strips(path) is None
+    assert np.array_equal(np.asarray(ScanTiles(path).pixels), np.asarray(image))
+
+
+def test_large_scan_limit_is_not_global(tmp_path):
+    path = str(tmp_path / "scan.tif")
+    noise_image("RGB").save(path)
+    limit = Image.MAX_IMAGE_PIXELS
+    open_scan(path, max_pixels=1000)
+    assert Image.MAX_IMAGE_PIXELS == limit
+    assert limit is None or limit < image_view.MAX_SCAN_PIXELS
+
+
+def test_tiff_without_pillow_internals_falls_back_to_full_decode(tmp_path, monkeypatch):
+    path = str(tmp_path / "scan.tif")
+    image = noise_image("RGB")
+    image.save(path)
+    monkeypatch.setattr(image_view, "TILE_FIELDS", ("missing_field",))
+    assert tiff_strips(path) is None
+    assert np.array_equal(np.asarray(ScanTiles(path).pixels), np.asarray(image))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="нужен /proc")
+def test_large_scan_file_is_closed(tmp_path):
+    path = str(tmp_path / "scan.tif")
+    noise_image("RGB").save(path)
+    image, pyramid = open_scan(path, max_pixels=1000)
+    assert pyramid.size == (301, 97)
+    opened = {os.path.realpath(os.path.join("/proc/self/fd", fd)) for fd in os.listdir("/proc/self/fd")}
+    assert os.path.realpath(path) not in opened
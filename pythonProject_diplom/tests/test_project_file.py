@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+
+import project_file
+from glyph import Glyph
+from project_file import GlyphProject, is_project_file
+
+
+def make_glyph(name, shift=0.0):
+    # Значения точно представимы во float32, поэтому сравниваются без допуска
+    curves = [[(10.0 + shift, 20.0, 2.5), (30.0, 40.0 + shift, 3.0), (50.0, 20.0, 2.0)],
+              [(5.0, 5.0, 1.5), (60.0 + shift, 5.0, 1.5)]]
+    return Glyph(name, curves, (0, 0, 64, 64))
+
+
+def assert_same(glyph, expected):
+    assert glyph.name == expected.name
+    assert glyph.curves == expected.curves
+    assert glyph.box == expected.box
+
+
+def reopen(path):
+    project = GlyphProject.open(path)
+    glyphs = {name: project.get(name) for name in project.names()}
+    project.close()
+    return glyphs
+
+
+def test_append_compact_reopen(tmp_path):
+    path = str(tmp_path / "font.fgp")
+    expected = {name: make_glyph(name, i) for i, name in enumerate("абвгд")}
+    project = GlyphProject(path)
+    for glyph in expected.values():
+        project.put(glyph)
+    project.save()
+    project.close()
+    assert is_project_file(path)
+    assert list(reopen(path)) == list(expected)
+
+    # Изменённый глиф дописывается в конец, старая копия остаётся в файле
+    project = GlyphProject.open(path)
+    size = os.path.getsize(path)
+    expected["б"] = make_glyph("б", 100.0)
+    project.put(expected["б"])
+    project.put(make_glyph("а", 0))  # Без изменений - не записывается
+    project.save()
+    assert os.path.getsize(path) > size
+    project.close()
+    for name, glyph in reopen(path).items():
+        assert_same(glyph, expected[name])
+
+    # Много мусора - файл переписывается целиком и становится меньше
+    project = GlyphProject.open(path)
+    size = os.path.getsize(path)
+    for name in "вгд":
+        project.remove(name)
+        del expected[name]
+    project.put(make_glyph("е", 7.0))
+    expected["е"] = make_glyph("е", 7.0)
+    project.save()
+    assert os.path.getsize(path) < size
+    project.close()
+    glyphs = reopen(path)
+    assert sorted(glyphs) == sorted(expected)
+    for name, glyph in glyphs.items():
+        assert_same(glyph, expected[name])
+
+
+def test_open_existing_keeps_other_glyphs(tmp_path):
+    path = str(tmp_path / "font.fgp")
+    project = GlyphProject(path)
+    project.put(make_glyph("а"))
+    project.save()
+    project.close()
+
+    # Первый сохраняемый глиф попадает в существующий проект, а не заменяет его
+    project = GlyphProject.open(path)
+    project.put(make_glyph("б", 1.0))
+    project.save()
+    project.close()
+    assert sorted(reopen(path)) == ["а", "б"]
+
+
+def test_version_1_curves_are_upgraded(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.fgp")
+    bezier = [(10.0, 10.0, 2.0), (30.0, 60.0, 3.0), (50.0, 10.0, 2.0)]
+    spline = [(10.0, 10.0, 2.0), (20.0, 30.0, 2.5), (30.0, 40.0, 3.0), (40.0, 20.0, 2.5), (50.0, 10.0, 2.0),
+              (60.0, 5.0, 2.0), (70.0, 5.0, 2.0)]
+    with monkeypatch.context() as patch:
+        patch.setattr(project_file, "VERSION", 1)
+        project = GlyphProject(path)
+        project.put(Glyph("а", [bezier, spline], (0, 0, 64, 64)))
+        project.save()
+        project.close()
+
+    # В версии 1 кривая до 6 точек была кривой Безье: она заменяется сплайном через точки на ней
+    project = GlyphProject.open(path)
+    curves = project.get("а").curves
+    assert len(curves[0]) > len(bezier) and curves[0][0] == bezier[0] and curves[0][-1] == bezier[-1]
+    assert curves[1] == spline
+    project.save()  # Файл старой версии переписывается целиком в новом формате
+    project.close()
+    upgraded = reopen(path)["а"].curves
+    assert np.allclose(upgraded[0], curves[0]) and upgraded[1] == spline
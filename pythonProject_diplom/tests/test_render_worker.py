@@ -0,0 +1,43 @@
+import time
+
+from render_worker import RenderWorker
+
+
+class FakeRoot:
+    """Главный цикл Tk: отложенные вызовы выполняются по времени в run()"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def after(self, ms, callback):
+        self.jobs.append((time.perf_counter() + ms / 1000, callback))
+        return len(self.jobs)
+
+    def run(self, until):
+        while time.perf_counter() < until:
+            due = [job for job in self.jobs if job[0] <= time.perf_counter()]
+            for job in due:
+                self.jobs.remove(job)
+                job[1]()
+            time.sleep(0.001)
+
+
+def test_slow_frames_are_shown_during_drag():
+    # Кадр рисуется 200 мс, а новые задания приходят каждые 16 мс (перетаскивание)
+    root = FakeRoot()
+    shown = []
+
+    def render(snapshot):
+        time.sleep(0.2)
+        return snapshot
+
+    worker = RenderWorker(root, render, shown.append)
+    start = time.perf_counter()
+    for step in range(60):
+        worker.submit(step)
+        root.run(start + (step + 1) * 0.016)
+    root.run(time.perf_counter() + 0.5)  # Отпускание: дорисовывается последнее задание
+
+    assert len(shown) >= 3
+    assert shown == sorted(shown)  # Устаревший кадр не выводится после более нового
+    assert shown[-1] == 59  # После отпускания выводится последний кадр
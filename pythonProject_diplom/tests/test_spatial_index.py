@@ -0,0 +1,89 @@
+import math
+import random
+
+import pytest
+
+from spatial_index import PointIndex
+
+CELL = 32
+
+
+def brute_nearest(points, x, y):
+    hits = [(math.hypot(x - px, y - py), key) for key, (px, py, radius) in points.items()
+            if math.hypot(x - px, y - py) <= radius]
+    return min(hits)[1] if hits else None
+
+
+def brute_rect(points, x0, y0, x1, y1):
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    return sorted(key for key, (px, py, _) in points.items() if x0 <= px <= x1 and y0 <= py <= y1)
+
+
+def random_points(rng, count):
+    points = {}
+    for idx in range(count):
+        if idx % 3 == 0:
+            # Точки на границах ячеек сетки
+            x, y = rng.randint(-4, 8) * CELL, rng.randint(-4, 8) * CELL
+        else:
+            x, y = rng.uniform(-150, 270), rng.uniform(-150, 270)
+        points[(idx // 10, idx % 10)] = (x, y, rng.choice([0.5, 3.0, 10.0, 40.0]))
+    return points
+
+
+def queries(rng, count):
+    for idx in range(count):
+        if idx % 4 == 0:
+            yield rng.randint(-4, 8) * CELL, rng.randint(-4, 8) * CELL
+        else:
+            yield rng.uniform(-200, 320), rng.uniform(-200, 320)
+
+
+def assert_matches(index, points, rng):
+    assert len(index) == len(points)
+    for x, y in queries(rng, 200):
+        assert index.nearest(x, y) == brute_nearest(points, x, y)
+    for (x0, y0), (x1, y1) in zip(queries(rng, 50), queries(rng, 50)):
+        assert index.query_rect(x0, y0, x1, y1) == brute_rect(points, x0, y0, x1, y1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_matches_brute_force(seed):
+    rng = random.Random(seed)
+    points = random_points(rng, 120)
+    index = PointIndex(CELL)
+    for key, point in points.items():
+        index.insert(key, *point)
+    assert_matches(index, points, rng)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_matches_brute_force_after_moves_and_removals(seed):
+    rng = random.Random(seed)
+    points = random_points(rng, 120)
+    index = PointIndex(CELL)
+    index.rebuild([[points[(curve, idx)] for idx in range(10)] for curve in range(12)])
+    for key in rng.sample(sorted(points), 40):
+        if rng.random() < 0.5:
+            del points[key]
+            index.remove(key)
+        else:
+            # Перемещение в другую ячейку или на её границу
+            x, y = (rng.randint(-4, 8) * CELL, rng.uniform(-150, 270)) if rng.random() < 0.5 else \
+                (rng.uniform(-150, 270), rng.uniform(-150, 270))
+            points[key] = (x, y, rng.choice([0.5, 3.0, 10.0]))
+            index.update(key, *points[key])
+    assert_matches(index, points, rng)
+
+
+def test_boundary_point_is_found_from_both_cells():
+    index = PointIndex(CELL)
+    index.insert((0, 0), CELL, CELL, 2.0)
+    assert index.nearest(CELL - 1.5, CELL) == (0, 0)
+    assert index.nearest(CELL + 1.5, CELL + 1.0) == (0, 0)
+    assert index.query_rect(0, 0, CELL, CELL) == [(0, 0)]
+    assert index.query_rect(CELL, CELL, 2 * CELL, 2 * CELL) == [(0, 0)]
+    index.remove((0, 0))
+    assert index.nearest(CELL, CELL) is None
+    assert index.query_rect(0, 0, 2 * CELL, 2 * CELL) == []
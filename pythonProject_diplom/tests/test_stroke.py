@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from PIL import ImageFilter
+
+from frame_renderer import FrameRenderer, FrameSnapshot
+from rasterize import render_glyph
+from glyph import Glyph
+from stroke import bezier_to_spline, curve_pieces, tessellate_curves
+
+CANVAS_SIZE = (500, 400)
+COLOR = (0, 0, 255, 255)
+
+STROKES = {
+    # Петля: штрих пересекает сам себя
+    "loop": [(100, 100, 10), (400, 300, 10), (400, 100, 10), (100, 300, 10)],
+    # Замкнутый штрих (как петли автотрассировки): последняя точка совпадает с первой
+    "closed": [(300, 100, 20), (400, 150, 20), (420, 250, 20), (300, 320, 20), (180, 250, 20),
+               (200, 150, 20), (300, 100, 20)],
+    # Крутой изгиб: внутренняя огибающая складывается
+    "tight_u": [(200, 100, 36), (200, 300, 36), (260, 300, 36), (260, 100, 36)],
+}
+
+
+def render_mask(tessellations, mode):
+    snapshot = FrameSnapshot(
+        canvas_size=CANVAS_SIZE, zoom=1.0, offset=(0, 0), quality=False, stroke_mode=mode, pyramid=None,
+        committed=(), active=(), handles=None, handles_key=None, overlay=None,
+    )
+    layer = FrameRenderer(COLOR, COLOR, COLOR).render_strokes(snapshot, tessellations)
+    return layer.getchannel("A")
+
+
+def coverage_difference(outline, stamps, margin=2):
+    """Пиксели, закрашенные только одним из режимов дальше margin от края другого"""
+    size = 2 * margin + 1
+    outline_mask = np.asarray(outline) > 0
+    stamp_mask = np.asarray(stamps) > 0
+    missing = np.asarray(stamps.filter(ImageFilter.MinFilter(size))) > 0
+    extra = np.asarray(outline.filter(ImageFilter.MinFilter(size))) > 0
+    return int((missing & ~outline_mask).sum()), int((extra & ~stamp_mask).sum())
+
+
+@pytest.mark.parametrize("name", sorted(STROKES))
+def test_outline_matches_stamps(name):
+    tessellations = tessellate_curves([STROKES[name]], 0.25, 0.25)
+    outline = render_mask(tessellations, "outline")
+    stamps = render_mask(tessellations, "stamp")
+    assert coverage_difference(outline, stamps) == (0, 0)
+
+
+def test_loop_crossing_is_filled():
+    tessellations = tessellate_curves([STROKES["loop"]], 0.25, 0.25)
+    # Точка самопересечения петли: при заливке по правилу чет-нечет здесь была дыра
+    crossing = render_mask(tessellations, "outline").getpixel((233, 200))
+    assert crossing == 255
+
+
+def test_closed_stroke_join_is_filled():
+    tessellations = tessellate_curves([STROKES["closed"]], 0.25, 0.25)
+    assert render_mask(tessellations, "outline").getpixel((300, 100)) == 255
+
+
+def test_export_has_no_holes():
+    glyph = Glyph("o", [STROKES["closed"], STROKES["loop"]], (0, 0) + CANVAS_SIZE)
+    image = render_glyph(glyph, CANVAS_SIZE[1], supersample=1)
+    tessellations = tessellate_curves([STROKES["closed"], STROKES["loop"]], 0.25, 0.25)
+    stamps = render_mask(tessellations, "stamp")
+    assert coverage_difference(image.getchannel("A"), stamps)[0] == 0
+
+
+def test_new_point_changes_only_last_segments():
+    # Кривая не меняет смысл при добавлении точки: прежние сегменты, кроме последнего, не меняются
+    points = [(100, 100, 10), (150, 180, 12), (220, 160, 8), (260, 240, 10), (320, 200, 14),
+              (360, 260, 10), (400, 220, 6), (440, 300, 10)]
+    for count in range(2, len(points)):
+        before = curve_pieces(points[:count])
+        after = curve_pieces(points[:count + 1])
+        assert len(after) == count
+        for old, new in zip(before[:-1], after):
+            assert np.array_equal(old, new)
+
+
+def test_bezier_to_spline_keeps_shape():
+    bezier = [(100, 100, 10), (150, 300, 20), (300, 300, 5), (350, 120, 15), (420, 200, 10)]
+    reference = np.array(bezier_to_spline(bezier, steps=500))  # Густая выборка самой кривой Безье
+    spline = tessellate_curves([bezier_to_spline(bezier)], 0.1, 0.1)[0]
+    distance = np.hypot(spline.xs[:, None] - reference[:, 0], spline.ys[:, None] - reference[:, 1]).min(axis=1)
+    assert distance.max() < 0.5
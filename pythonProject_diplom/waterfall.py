@@ -0,0 +1,44 @@
+"""Образец текста в нескольких кеглях ("водопад") из кэшированных изображений глифов"""
+from PIL import Image, ImageDraw
+
+from rasterize import render_glyph
+
+WATERFALL_SIZES = (12, 24, 48, 96)
+SAMPLE_TEXT = "Съешь же ещё этих мягких французских булок"
+MARGIN = 10
+LABEL_WIDTH = 30  # Колонка с подписью кегля
+LINE_SPACING = 1.3  # Межстрочный интервал в долях кегля
+LETTER_SPACING = 0.08  # Промежуток между глифами в долях кегля
+SPACE_WIDTH = 0.35  # Ширина пробела и символа без глифа в долях кегля
+
+
+def waterfall_height(sizes=WATERFALL_SIZES):
+    return 2 * MARGIN + sum(round(size * LINE_SPACING) for size in sizes)
+
+
+def render_waterfall(text, lookup, cache, width, sizes=WATERFALL_SIZES,
+                     color=(0, 0, 0, 255), background=(255, 255, 255, 255)):
+    """Строки образца для каждого кегля; строка обрезается по ширине.
+
+    lookup(символ) возвращает (ключ глифа, версия, функция без аргументов -> Glyph) или None.
+    Изображения глифов берутся из cache (GlyphBitmapCache) и растеризуются только при промахе.
+    """
+    image = Image.new("RGBA", (width, waterfall_height(sizes)), background)
+    draw = ImageDraw.Draw(image)
+    y = MARGIN
+    for size in sizes:
+        draw.text((MARGIN, y), str(size), fill=(128, 128, 128, 255))
+        x = MARGIN + LABEL_WIDTH
+        for char in text:
+            if x >= width:
+                break
+            found = lookup(char)
+            if found is None:
+                x += round(size * SPACE_WIDTH)
+                continue
+            glyph_id, version, make_glyph = found
+            bitmap = cache.get(glyph_id, version, size, lambda: render_glyph(make_glyph(), size, color))
+            image.alpha_composite(bitmap, (x, y))
+            x += bitmap.width + round(size * LETTER_SPACING)
+        y += round(size * LINE_SPACING)
+    return image